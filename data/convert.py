@@ -1,5 +1,10 @@
-import pandas as pd
 import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+MUSK_LABEL = 1
 
 def transform_musk_final_fix(input_file, output_file):
     """
@@ -41,5 +46,63 @@ def transform_musk_final_fix(input_file, output_file):
     except Exception as e:
         print(f"Fehler: {e}")
 
+def clean_chunk(texts):
+    """Vektorisierte Bereinigung: Zeilenumbrüche -> Leerzeichen, leere Tweets raus. Kommas bleiben (CSV wird gequotet)."""
+    texts = texts.dropna().astype(str).str.replace(r'[\r\n]+', ' ', regex=True).str.strip()
+    texts = texts[texts != '']
+    return pd.DataFrame({'label': MUSK_LABEL, 'text': texts.values})
+
+def transform_musk_streaming(input_file, output_file, chunksize=100_000, workers=1):
+    """
+    Streaming-Variante für große Kaggle-Dumps:
+    - liest nur die Spalte 'fullText' mit dem C-Parser in Chunks
+    - bereinigt jeden Chunk vektorisiert (bei workers > 1 verteilt auf einen Prozess-Pool)
+    - schreibt sofort im Trainingsformat 'label,text' als korrekt gequotetes CSV
+    Der Speicherbedarf hängt nur von chunksize (und workers) ab, nicht von der Dateigröße.
+    """
+    columns = pd.read_csv(input_file, nrows=0).columns
+    if 'fullText' not in columns:
+        print("Fehler: Spalte 'fullText' fehlt.")
+        return
+
+    chunks = (chunk['fullText'] for chunk in pd.read_csv(
+        input_file, usecols=['fullText'], chunksize=chunksize, on_bad_lines='skip', dtype=str))
+
+    rows = 0
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        f.write('label,text\n')
+
+        def write(df):
+            nonlocal rows
+            df.to_csv(f, header=False, index=False)
+            rows += len(df)
+            print(f"  {rows:,} Zeilen geschrieben", end='\r')
+
+        if workers <= 1:
+            for texts in chunks:
+                write(clean_chunk(texts))
+        else:
+            # Höchstens 2 * workers Chunks gleichzeitig unterwegs, Reihenfolge bleibt erhalten
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for texts in chunks:
+                    in_flight.append(pool.submit(clean_chunk, texts))
+                    if len(in_flight) >= 2 * workers:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+
+    print(f"\nDatei erfolgreich bereinigt und gespeichert: {output_file} ({rows:,} Zeilen)")
+
 if __name__ == "__main__":
-    transform_musk_final_fix('all_musk_posts.csv', 'musk_fixed_final.csv')
\ No newline at end of file
+    # python data/convert.py --stream [eingabe.csv] [ausgabe.csv] [--workers=N]
+    # -> Streaming-Modus mit gequotetem CSV. Die Bereinigung ist vektorisiert und meist schneller als das
+    #    Einlesen; --workers lohnt sich erst, wenn pro Chunk mehr Arbeit anfällt.
+    if "--stream" in sys.argv:
+        args = [a for a in sys.argv[1:] if not a.startswith("--")]
+        workers = next((int(a.split("=", 1)[1]) for a in sys.argv if a.startswith("--workers=")), 1)
+        input_file = args[0] if len(args) > 0 else 'all_musk_posts.csv'
+        output_file = args[1] if len(args) > 1 else 'musk_fixed_stream.csv'
+        transform_musk_streaming(input_file, output_file, workers=workers)
+    else:
+        transform_musk_final_fix('all_musk_posts.csv', 'musk_fixed_final.csv')
\ No newline at end of file
@@ -0,0 +1,233 @@
+import sys
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Fetch-Engine für Mastodon-artige Timelines (/api/v1/accounts/{id}/statuses).
+#
+# max_id-Paging ist von Natur aus sequenziell (die nächste Seite hängt von der letzten ID ab).
+# Deshalb wird der ID-Bereich in Zeitfenster ("Lanes") aufgeteilt – Mastodon-IDs sind Snowflakes
+# ((Millisekunden << 16) | Sequenz) – und jede Lane paged mit max_id + since_id für sich.
+# Mehrere Lanes laufen gleichzeitig, alle Anfragen teilen sich einen adaptiven Token-Bucket,
+# und die Ausgabe bleibt trotzdem strikt nach ID absteigend (neu -> alt).
+
+PAGE_LIMIT = 40
+# Truth Social ging im Februar 2022 online, ältere Posts gibt es nicht
+EARLIEST = datetime(2022, 2, 1, tzinfo=timezone.utc)
+
+def id_from_time(dt):
+    """Kleinste Snowflake-ID für einen Zeitpunkt."""
+    return int(dt.timestamp() * 1000) << 16
+
+def parse_retry_after(value):
+    """Retry-After ist entweder eine Anzahl Sekunden oder ein HTTP-Datum."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def parse_reset(value):
+    """X-RateLimit-Reset (ISO 8601) in Sekunden ab jetzt."""
+    if not value:
+        return None
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (reset - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """
+    Thread-sicherer Token-Bucket mit AIMD-Anpassung:
+    bei Erfolg steigt die Rate langsam (bis max_rate), bei 429 halbiert sie sich
+    und der Bucket pausiert bis Retry-After abgelaufen ist.
+    """
+
+    def __init__(self, rate, max_rate=None, min_rate=0.2, capacity=None):
+        self.rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min_rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 0.05 * self.max_rate)
+
+    def on_rate_limited(self, retry_after=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.pause(retry_after if retry_after is not None else 1 / self.rate)
+
+class FetchError(RuntimeError):
+    pass
+
+class _Lane:
+    """Ein Zeitfenster (lo, hi): wird mit max_id absteigend bis since_id=lo abgearbeitet."""
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.max_id = hi
+        self.pages = deque()
+        self.done = False
+        self.errors = 0
+
+class FetchEngine:
+    """
+    `fetch_many(urls)` führt mehrere GET-Anfragen gleichzeitig aus und gibt pro URL
+    (status, headers, json) zurück – z.B. http_fetch_many() oder ein Browser-fetch() mit Promise.all.
+    Die Engine selbst läuft in einem Thread, damit das auch mit der (nicht thread-sicheren) Playwright-API klappt.
+    """
+
+    def __init__(self, fetch_many, base_url, user_id, concurrency=4, rate=2.0, max_rate=None,
+                 limit=PAGE_LIMIT, max_errors=5, on_error=None):
+        self.fetch_many = fetch_many
+        self.base_url = base_url.rstrip("/")
+        self.user_id = user_id
+        self.concurrency = concurrency
+        self.limiter = TokenBucket(rate, max_rate=max_rate)
+        self.limit = limit
+        self.max_errors = max_errors
+        self.on_error = on_error
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "statuses": 0}
+
+    def url(self, lane):
+        return (f"{self.base_url}/api/v1/accounts/{self.user_id}/statuses"
+                f"?limit={self.limit}&max_id={lane.max_id}&since_id={lane.lo}")
+
+    def _handle(self, lane, status, headers, data):
+        self.stats["requests"] += 1
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+        if status == 200 and isinstance(data, list):
+            lane.errors = 0
+            self.limiter.on_success()
+            # Server sagt "Kontingent aufgebraucht": bis zum Reset warten statt in 429 zu laufen
+            if headers.get("x-ratelimit-remaining") == "0":
+                reset = parse_reset(headers.get("x-ratelimit-reset"))
+                if reset:
+                    self.limiter.pause(reset)
+            items = [s for s in data if lane.lo < int(s["id"]) < lane.max_id]
+            if not items:
+                lane.done = True
+                return
+            lane.pages.append(items)
+            lane.max_id = int(items[-1]["id"])
+            self.stats["statuses"] += len(items)
+        elif status == 429:
+            self.stats["rate_limited"] += 1
+            self.limiter.on_rate_limited(parse_retry_after(headers.get("retry-after")))
+        else:
+            self.stats["errors"] += 1
+            lane.errors += 1
+            if self.on_error:
+                self.on_error(status, lane.errors)
+            if lane.errors > self.max_errors:
+                raise FetchError(f"{lane.errors} Fehler in Folge (letzter Status: {status})")
+            self.limiter.pause(min(2 ** lane.errors, 60))
+
+    def pages(self, max_id=None, since_id=None, windows=None):
+        """
+        Generator über Seiten (Listen von Statuses), strikt absteigend nach ID über alle Seiten hinweg.
+        max_id/since_id begrenzen den Bereich (exklusiv), Standard: jetzt bis EARLIEST.
+        """
+        hi = int(max_id) if max_id else id_from_time(datetime.now(timezone.utc)) + (1 << 16)
+        lo = int(since_id) if since_id else id_from_time(EARLIEST)
+        windows = windows or self.concurrency * 4
+        step = max((hi - lo) // windows, 1)
+        bounds = [hi - i * step for i in range(windows)] + [lo]
+        lanes = [_Lane(bounds[i + 1], bounds[i]) for i in range(windows)]
+
+        head = 0
+        while head < len(lanes):
+            # Die vordersten (neuesten) offenen Lanes zuerst, damit die Ausgabe schnell weiterläuft
+            active = [lane for lane in lanes[head:] if not lane.done][:self.concurrency]
+            for _ in active:
+                self.limiter.acquire()
+            responses = self.fetch_many([self.url(lane) for lane in active])
+            for lane, (status, headers, data) in zip(active, responses):
+                self._handle(lane, status, headers, data)
+
+            # Nur Seiten der vordersten Lane ausgeben – spätere Lanes puffern, bis sie dran sind
+            while head < len(lanes):
+                lane = lanes[head]
+                while lane.pages:
+                    yield lane.pages.popleft()
+                if not lane.done:
+                    break
+                head += 1
+
+def http_fetch_many(headers=None, timeout=30):
+    """fetch_many-Implementierung mit urllib und einem Thread-Pool (für den Mock-Server oder offene APIs)."""
+    pool = ThreadPoolExecutor(max_workers=16)
+
+    def fetch(url):
+        request = urllib.request.Request(url, headers=headers or {"Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status, dict(response.headers), json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), None
+        except (urllib.error.URLError, TimeoutError, ValueError):
+            return 0, {}, None
+
+    def fetch_many(urls):
+        return list(pool.map(fetch, urls))
+    return fetch_many
+
+def selftest():
+    """Lädt alle Posts vom lokalen Mock-Server und prüft Vollständigkeit und Reihenfolge."""
+    from mock_server import start_server
+
+    server, statuses, server_limit = start_server(posts=2000, rate=8.0, burst=8, latency=0.05)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    engine = FetchEngine(http_fetch_many(), base_url, user_id=1, concurrency=6, rate=20.0)
+
+    start = time.perf_counter()
+    since = int(statuses[-1]["id"]) - 1
+    ids = [int(s["id"]) for page in engine.pages(since_id=since) for s in page]
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    expected = [int(s["id"]) for s in statuses]
+    assert ids == expected, f"{len(ids)} von {len(expected)} Posts, Reihenfolge/Vollständigkeit falsch"
+    print(f"OK: {len(ids)} Posts in {elapsed:.1f}s, strikt absteigend, keine Duplikate")
+    print(f"Engine: {engine.stats} | Endrate: {engine.limiter.rate:.1f}/s | Server: {server_limit.served} bedient, {server_limit.rejected} mit 429 abgelehnt")
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        selftest()
\ No newline at end of file
@@ -0,0 +1,132 @@
+import re
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Lokaler Ersatz für den Mastodon/TruthSocial-Endpunkt /api/v1/accounts/{id}/statuses
+# inklusive Rate-Limit (429 + Retry-After, X-RateLimit-* Header), um die Fetch-Engine ohne Browser zu testen.
+# Aufruf: python data/mock_server.py --port 8765 --posts 2000 --rate 5
+
+STATUS_PATH = re.compile(r'^/api/v1/accounts/(\d+)/statuses$')
+
+def make_statuses(count, days=365, seed_time=None):
+    """Erzeugt `count` Posts mit Mastodon-Snowflake-IDs ((ms << 16) | seq), neueste zuerst."""
+    end = seed_time or datetime(2026, 1, 20, tzinfo=timezone.utc)
+    step = timedelta(days=days) / max(count, 1)
+    statuses = []
+    for i in range(count):
+        created = end - step * i
+        status_id = (int(created.timestamp() * 1000) << 16) | (i & 0xFFFF)
+        statuses.append({
+            "id": str(status_id),
+            "created_at": created.isoformat().replace("+00:00", "Z"),
+            "content": f"<p>Post number {count - i}, with a comma</p>",
+        })
+    return statuses
+
+class ServerRateLimit:
+    """Token-Bucket auf Serverseite: `rate` Anfragen pro Sekunde, Burst `burst`."""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.rejected = 0
+        self.served = 0
+
+    def take(self):
+        """Gibt (erlaubt, verbleibend, Sekunden bis wieder ein Token da ist) zurück."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.served += 1
+                return True, int(self.tokens), 0.0
+            self.rejected += 1
+            return False, 0, (1 - self.tokens) / self.rate
+
+def make_handler(statuses, limiter, latency=0.0):
+    ids = [int(s["id"]) for s in statuses]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body, headers=()):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not STATUS_PATH.match(url.path):
+                return self._send(404, {"error": "Record not found"})
+
+            allowed, remaining, wait = limiter.take()
+            reset = datetime.now(timezone.utc) + timedelta(seconds=wait)
+            rate_headers = [
+                ("X-RateLimit-Limit", str(limiter.burst)),
+                ("X-RateLimit-Remaining", str(remaining)),
+                ("X-RateLimit-Reset", reset.isoformat().replace("+00:00", "Z")),
+            ]
+            if not allowed:
+                retry_after = max(1, round(wait))
+                return self._send(429, {"error": "Too many requests"}, rate_headers + [("Retry-After", str(retry_after))])
+
+            query = parse_qs(url.query)
+            limit = min(int(query.get("limit", ["20"])[0]), 40)
+            max_id = int(query["max_id"][0]) if "max_id" in query else None
+            since_id = int(query["since_id"][0]) if "since_id" in query else None
+
+            # Wie Mastodon: neueste zuerst, strikt unter max_id und strikt über since_id
+            page = []
+            for status_id, status in zip(ids, statuses):
+                if max_id is not None and status_id >= max_id:
+                    continue
+                if since_id is not None and status_id <= since_id:
+                    break
+                page.append(status)
+                if len(page) >= limit:
+                    break
+
+            if latency:
+                time.sleep(latency)
+            self._send(200, page, rate_headers)
+
+    return Handler
+
+def start_server(port=0, posts=2000, rate=5.0, burst=5, latency=0.05):
+    """Startet den Server in einem Hintergrund-Thread und gibt (server, statuses, limiter) zurück."""
+    statuses = make_statuses(posts)
+    limiter = ServerRateLimit(rate, burst)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(statuses, limiter, latency))
+    threading.Thread(target=server.serve_forever, name="mock-mastodon", daemon=True).start()
+    return server, statuses, limiter
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mastodon-ähnlicher Test-Server mit Rate-Limit")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=5.0, help="Erlaubte Anfragen pro Sekunde")
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Künstliche Antwortzeit in Sekunden")
+    args = parser.parse_args()
+
+    server, _, _ = start_server(args.port, args.posts, args.rate, args.burst, args.latency)
+    print(f"Mock-Server läuft auf http://127.0.0.1:{args.port}/api/v1/accounts/1/statuses (Strg+C zum Beenden)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import sys
+import sqlite3
+import pandas as pd
+
+# Eingebetteter Post-Speicher für den Scraper (SQLite im WAL-Modus), ersetzt CSV-Anhängen + last_id.txt.
+# - Primärschlüssel ist die Status-ID -> doppelte Posts (Scrollen + API, Neustarts) werden einfach überschrieben
+# - Posts und Wiederaufsetzpunkt werden in derselben Transaktion geschrieben -> ein Absturz verliert nichts
+# - vorhandene CSVs ohne IDs (data/trump_truths_social.csv) werden einmalig mit negativen Ersatz-IDs übernommen,
+#   damit der Export sie nicht verliert: python data/post_store.py import-csv data/trump_truths_social.csv
+# Export ins Trainingsformat: python data/post_store.py export [datei.csv|datei.parquet]
+#   (Standard: data/trump_truths_social.csv, die Datei, die src/corpus.py liest; wird vorher übernommen, falls nötig)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(script_dir, "posts.db")  # neben den CSVs, unabhängig vom Arbeitsverzeichnis
+EXPORT_FILE = os.path.join(script_dir, "trump_truths_social.csv")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id          INTEGER PRIMARY KEY,
+    label       INTEGER NOT NULL,
+    text        TEXT NOT NULL,
+    created_at  TEXT,
+    scraped_at  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class PostStore:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL reicht mit WAL: nach einem Absturz ist die DB konsistent, höchstens die letzte Transaktion fehlt
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Einmal zählen, danach mitführen: count() kostet pro Batch nichts mehr
+        self._count = self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def upsert_many(self, rows, cursor=None):
+        """
+        Schreibt (id, label, text, created_at)-Zeilen in einer Transaktion; vorhandene IDs werden aktualisiert.
+        Mit `cursor=(name, wert)` wird der Wiederaufsetzpunkt in derselben Transaktion gesetzt.
+        Gibt die Anzahl neuer Posts zurück.
+        """
+        rows = [(int(i), label, text, created_at) for i, label, text, created_at in rows]
+        ids = list({row[0] for row in rows})
+        with self.conn:
+            # Neue Posts = IDs im Batch, die noch nicht existieren (Lookup über den Primärschlüssel, O(Batch))
+            existing = 0
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                existing += self.conn.execute(
+                    f"SELECT COUNT(*) FROM posts WHERE id IN ({','.join('?' * len(part))})", part).fetchone()[0]
+            self.conn.executemany(
+                """INSERT INTO posts (id, label, text, created_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET text = excluded.text,
+                                                 created_at = COALESCE(excluded.created_at, posts.created_at)""",
+                rows,
+            )
+            if cursor:
+                self._write_cursor(*cursor)
+        added = len(ids) - existing
+        self._count += added
+        return added
+
+    def count(self):
+        return self._count
+
+    def get_cursor(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _write_cursor(self, name, value):
+        self.conn.execute(
+            "INSERT INTO cursors (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, str(value)),
+        )
+
+    def set_cursor(self, name, value):
+        with self.conn:
+            self._write_cursor(name, value)
+
+    def import_id_tracker(self, path, name="max_id"):
+        """Übernimmt einen alten last_id.txt-Stand, falls noch kein Cursor gespeichert ist."""
+        if self.get_cursor(name) is None and os.path.exists(path):
+            with open(path, 'r') as f:
+                value = f.read().strip()
+            if value:
+                self.set_cursor(name, value)
+
+    def import_csv(self, path, force=False):
+        """
+        Übernimmt eine Trainings-CSV (label,text) ohne Status-IDs, z.B. den Bestand von vor dem PostStore.
+        Die Zeilen bekommen die IDs -n, ..., -2, -1 in Dateireihenfolge: sie liegen vor allen gescrapten Posts
+        und behalten beim Export (ORDER BY id ASC) ihre Reihenfolge. Texte, die schon gespeichert sind, werden
+        übersprungen. Jede Datei wird nur einmal übernommen (Cursor "import:<datei>"), außer mit `force`.
+        Gibt die Anzahl neuer Posts zurück.
+        """
+        cursor = f"import:{os.path.basename(path)}"
+        if self.get_cursor(cursor) is not None and not force:
+            return 0
+        df = pd.read_csv(path, on_bad_lines='skip', dtype={'text': str}).dropna(subset=["text"])
+        known = {row[0] for row in self.conn.execute("SELECT text FROM posts")}
+        rows = [(i - len(df), int(label), text, None)
+                for i, (label, text) in enumerate(zip(df["label"], df["text"])) if text not in known]
+        return self.upsert_many(rows, cursor=(cursor, len(df)))
+
+    def export(self, path=EXPORT_FILE, chunksize=50000):
+        """
+        Exportiert alle Posts (älteste zuerst) als Trainings-CSV (label,text) oder Parquet (.parquet).
+        Neue Posts landen so am Dateiende: corpus_stats.py und search_index.py werten nur die angehängten Zeilen aus.
+        Ist die Ziel-CSV noch nicht übernommen, wird sie vorher importiert, damit keine Zeilen verloren gehen.
+        Geschrieben wird in eine temporäre Datei, die erst am Ende die alte ersetzt.
+        """
+        if path.endswith(".csv") and os.path.exists(path):
+            added = self.import_csv(path)
+            if added:
+                print(f"{added} Posts aus {path} übernommen.")
+        query = "SELECT label, text FROM posts ORDER BY id ASC"
+        tmp = path + ".tmp"
+        if path.endswith(".parquet"):
+            pd.read_sql_query(query, self.conn).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            return
+        first = True
+        for chunk in pd.read_sql_query(query, self.conn, chunksize=chunksize):
+            chunk.to_csv(tmp, mode='w' if first else 'a', header=first, index=False, encoding='utf-8')
+            first = False
+        if first:
+            pd.DataFrame(columns=["label", "text"]).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "export":
+        path = sys.argv[2] if len(sys.argv) >= 3 else EXPORT_FILE
+        store = PostStore()
+        store.export(path)
+        print(f"{store.count()} Posts nach {path} exportiert.")
+        store.close()
+    elif len(sys.argv) >= 3 and sys.argv[1] == "import-csv":
+        store = PostStore()
+        added = store.import_csv(sys.argv[2], force="--force" in sys.argv)
+        print(f"{added} Posts aus {sys.argv[2]} übernommen ({store.count()} gespeichert).")
+        store.close()
+    else:
+        print("Aufruf: python data/post_store.py export [datei.csv|datei.parquet]\n"
+              "        python data/post_store.py import-csv <datei.csv> [--force]")
\ No newline at end of file
@@ -1,16 +1,17 @@
 import json
-import pandas as pd
 import time
 import re
 import random
-import os
 from playwright.sync_api import sync_playwright
 from playwright_stealth import stealth_sync
+from fetch_engine import FetchEngine, FetchError
+from post_store import PostStore, DB_FILE
 
 # Konstanten
 TRUMP_ID = "107780257626128497"
-SAVE_FILE = "trump_truths_progress.csv"
-ID_TRACKER = "last_id.txt"
+TRUMP_LABEL = 0
+ID_TRACKER = "last_id.txt"  # nur noch zum einmaligen Übernehmen alter Stände
+MAX_ERRORS = 5
 
 def clean_html(raw_html):
     if not raw_html: return ""
@@ -18,15 +19,56 @@ def clean_html(raw_html):
     cleantext = re.sub(cleanr, '', raw_html)
     return cleantext.replace('\n', ' ').replace('\r', '').replace(',', ';').strip()
 
+def browser_fetch_many(page):
+    """
+    fetch_many für die FetchEngine: alle URLs per Promise.all gleichzeitig im Browser-Kontext abrufen.
+    So werden Cookies/Headers des eingeloggten Browsers genutzt, und Playwright wird nur aus einem Thread bedient.
+    """
+    def fetch_many(urls):
+        results = page.evaluate("""async (urls) => Promise.all(urls.map(async (url) => {
+            try {
+                const response = await fetch(url, {
+                    headers: {
+                        'Accept': 'application/json, text/plain, */*',
+                        'Content-Type': 'application/json'
+                    }
+                });
+                const headers = {};
+                for (const name of ['retry-after', 'x-ratelimit-remaining', 'x-ratelimit-reset']) {
+                    const value = response.headers.get(name);
+                    if (value !== null) headers[name] = value;
+                }
+                return {
+                    status: response.status,
+                    headers: headers,
+                    json: await response.json().catch(() => null)
+                };
+            } catch (e) {
+                return { status: 0, headers: {}, error: e.toString() };
+            }
+        }))""", urls)
+        return [(r.get('status'), r.get('headers'), r.get('json')) for r in results]
+    return fetch_many
+
+def to_rows(items):
+    """API-Einträge -> (id, label, text, created_at)-Zeilen für den PostStore."""
+    rows = []
+    for entry in items:
+        content = clean_html(entry.get('content', ''))
+        if content and entry.get('id'):
+            rows.append((entry['id'], TRUMP_LABEL, content, entry.get('created_at')))
+    return rows
+
 def run_resilient_scraper(user_id, target_count=10000):
-    all_truths = []
-    
+    # Posts landen in SQLite (Schlüssel = Status-ID), Duplikate aus Scrollen/API/Neustarts werden zusammengeführt
+    store = PostStore(DB_FILE)
+    store.import_id_tracker(ID_TRACKER)
+    new_posts = 0
+
     # Lade die letzte ID, falls das Skript neu gestartet wurde
-    max_id = None
-    if os.path.exists(ID_TRACKER):
-        with open(ID_TRACKER, 'r') as f:
-            max_id = f.read().strip()
-            print(f"Setze Scraping ab ID {max_id} fort...")
+    max_id = store.get_cursor("max_id")
+    if max_id:
+        print(f"Setze Scraping ab ID {max_id} fort... ({store.count()} Posts gespeichert)")
 
     # Persistenter Context speichert Cookies/Session, damit man das Captcha nur einmal lösen muss
     user_data_dir = "user_data"
@@ -54,11 +96,11 @@ def run_resilient_scraper(user_id, target_count=10000):
         # Response Listener, um die Daten "passiv" abzufangen beim Scrollen
         # Das vermeidet, dass wir selbst API Requests stellen müssen, die geblockt werden.
         def handle_response(response):
+            nonlocal new_posts
             # Prüfen ob es ein Status-Update Response ist
             if "api/v1/accounts" in response.url and "statuses" in response.url and response.status == 200:
                 try:
                     data = response.json()
-                    new_batch = []
                     
                     # Manchmal kommt eine Liste, manchmal Pagination-Objekt? 
                     # Bei Mastodon/TruthSocial ist es meist eine Liste.
@@ -69,25 +111,12 @@ def run_resilient_scraper(user_id, target_count=10000):
 
                     if not items: return
 
-                    local_max_id = None
-                    for entry in items:
-                        content = clean_html(entry.get('content', ''))
-                        if content:
-                            new_batch.append(["Trump", content])
-                        local_max_id = entry.get('id')
-                    
-                    if new_batch:
-                        # Speichern
-                        df_temp = pd.DataFrame(new_batch)
-                        df_temp.to_csv(SAVE_FILE, mode='a', index=False, header=False, encoding='utf-8')
-                        
-                        all_truths.extend(new_batch)
-                        print(f"Captured {len(new_batch)} posts via scrolling. Total: {len(all_truths)}")
-
-                        # ID Tracker updaten (optional, da wir eh scrollen)
-                        if local_max_id:
-                            with open(ID_TRACKER, 'w') as f:
-                                f.write(str(local_max_id))
+                    # Speichern (ohne Cursor: Scrollen läuft unabhängig vom API-Paging)
+                    rows = to_rows(items)
+                    if rows:
+                        added = store.upsert_many(rows)
+                        new_posts += added
+                        print(f"Captured {len(rows)} posts via scrolling ({added} neu). Total: {store.count()}")
                                 
                 except Exception as e:
                     # JSON Fehler oder so
@@ -132,103 +161,47 @@ def run_resilient_scraper(user_id, target_count=10000):
             time.sleep(2)
 
         print("Timeline erkannt! Wechsle zum Hochgeschwindigkeits-Modus (API Fetch)...")
-        
-        # Backoff Variablen
-        backoff_time = 10
-        consecutive_errors = 0
-        
-        while len(all_truths) < target_count:
-            # URL bauen
-            api_url = f"https://truthsocial.com/api/v1/accounts/{user_id}/statuses?limit=40" # Limit 40 ist oft Standard
-            if max_id:
-                api_url += f"&max_id={max_id}"
-                
-            print(f"Hole Daten... (Gesamt: {len(all_truths)})")
-            
-            try:
-                # Führe fetch() direkt im Browser-Kontext aus
-                # Das nutzt exakt die Cookies/Headers des eingeloggten Users/Browsers
-                response_data = page.evaluate(f"""async () => {{
-                    try {{
-                        const response = await fetch("{api_url}", {{
-                            headers: {{
-                                'Accept': 'application/json, text/plain, */*',
-                                'Content-Type': 'application/json'
-                            }}
-                        }});
-                        return {{
-                            status: response.status,
-                            json: await response.json().catch(() => null)
-                        }};
-                    }} catch (e) {{
-                        return {{ status: 0, error: e.toString() }};
-                    }}
-                }}""")
-                
-                status = response_data.get('status')
-                
-                if status == 200:
-                    data = response_data.get('json')
-                    
-                    if not data:
-                        print("Keine weiteren Daten empfangen (Leere Liste).")
-                        break
-                        
-                    # Daten verarbeiten
-                    new_batch = []
-                    for entry in data:
-                        content = clean_html(entry.get('content', ''))
-                        if content:
-                            new_batch.append(["Trump", content])
-                        max_id = entry.get('id')
-                    
-                    # Speichern
-                    if new_batch:
-                        df_temp = pd.DataFrame(new_batch)
-                        df_temp.to_csv(SAVE_FILE, mode='a', index=False, header=False, encoding='utf-8')
-                        all_truths.extend(new_batch)
-                        print(f" + {len(new_batch)} Posts geladen. (ID: {max_id})")
-                    
-                    # Reset Error Counters
-                    backoff_time = 5
-                    consecutive_errors = 0
-                    
-                    # Save ID
-                    if max_id:
-                        with open(ID_TRACKER, 'w') as f:
-                            f.write(str(max_id))
-                            
-                    # Kurze Pause für API Fairness (schneller als Scrollen, aber nicht zu aggressiv)
-                    time.sleep(random.uniform(1.0, 2.0))
-                    
-                elif status == 429:
-                    print(f"Rate Limit (429). Warte {backoff_time}s...")
-                    time.sleep(backoff_time)
-                    backoff_time = min(backoff_time * 2, 60) # Max 60s
-                    
-                elif status == 403:
-                    print("Zugriff 403 (Forbidden). Cloudflare Check? Warte und bewege Maus...")
-                    page.mouse.move(random.uniform(100, 500), random.uniform(100, 500))
-                    time.sleep(5)
-                    consecutive_errors += 1
-                    
-                else:
-                    print(f"Unerwarteter Status: {status}")
-                    time.sleep(5)
-                    consecutive_errors += 1
-                    
-                if consecutive_errors > 5:
-                    print("Zu viele Fehler in Folge. Breche ab (oder Pause).")
-                    time.sleep(30)
-                    # Versuch eines Reloads um Session zu fixen
-                    page.reload()
-                    time.sleep(10)
-                    consecutive_errors = 0
-            
-            except Exception as e:
-                print(f"Fehler bei Request: {e}")
-                time.sleep(5)
-            
+
+        # 403 = Cloudflare-Check: Maus bewegen, bei vielen Fehlern in Folge die Seite neu laden
+        def handle_error(status, errors):
+            print(f"Status {status} ({errors}. Fehler in Folge)")
+            if status == 403:
+                page.mouse.move(random.uniform(100, 500), random.uniform(100, 500))
+            if errors == MAX_ERRORS:
+                print("Zu viele Fehler in Folge. Lade Seite neu...")
+                page.reload()
+                time.sleep(10)
+
+        # Mehrere Zeitfenster parallel, gemeinsamer Token-Bucket, Ausgabe strikt nach ID geordnet
+        engine = FetchEngine(
+            browser_fetch_many(page),
+            "https://truthsocial.com",
+            user_id,
+            concurrency=4,
+            rate=1.0,
+            max_rate=4.0,
+            max_errors=MAX_ERRORS + 2,
+            on_error=handle_error,
+        )
+
+        try:
+            for items in engine.pages(max_id=max_id):
+                max_id = items[-1]['id']
+
+                # Posts + Wiederaufsetzpunkt in einer Transaktion
+                # (Seiten kommen strikt absteigend, also ist die letzte ID ein gültiger Cursor)
+                added = store.upsert_many(to_rows(items), cursor=("max_id", max_id))
+                new_posts += added
+                print(f" + {added} neue Posts geladen. (ID: {max_id}) | Rate: {engine.limiter.rate:.1f}/s")
+
+                if new_posts >= target_count:
+                    break
+        except FetchError as e:
+            print(f"Abbruch: {e}")
+
+        print(f"Fertig. {engine.stats} | {store.count()} Posts in {DB_FILE}")
+        print("Export fürs Training (nach data/trump_truths_social.csv): python data/post_store.py export")
         browser.close()
+        store.close()
 
 run_resilient_scraper(TRUMP_ID, 10000)
\ No newline at end of file
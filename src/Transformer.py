@@ -1,34 +1,286 @@
+import os
+import sys
+import math
+import time
+import shutil
+import bisect
+import numpy as np
 import torch
-from safetensors.torch import load_file
-from transformers import AutoModelForSequenceClassification, Trainer, TrainingArguments
+from safetensors import safe_open
+from transformers import AutoModelForSequenceClassification, Trainer, TrainerCallback, TrainingArguments
+from transformers.trainer_utils import get_last_checkpoint
+from tokenizer import KEYS_FILE, load_keys, save_keys
 
-# CUDA CHECK
-print(torch.cuda.is_available())
+PAD_TOKEN_ID = 1  # <pad> bei BERTweet
+
+FINAL_MODEL = "./final_model"
+PUBLISHED_MODEL = "dxxrk/BERTweet-tuned-ElonTrumpPrediction"
+TRAINED_KEYS_FILE = ".data/trained_keys.npy"   # SHA-1 aller Texte, auf denen FINAL_MODEL bzw. das veröffentlichte Modell trainiert ist
+SAVE_STEPS = 500                               # Checkpoint spätestens alle 500 Schritte (kurze Läufe öfter), die letzten 2 bleiben erhalten
+
+# Inkrementeller Modus: nur neue Posts + eine Stichprobe alter Posts (gegen Vergessen), eine Epoche
+REPLAY_RATIO = 1.0       # alte Posts pro neuem Post
+MIN_REPLAY = 2000
 
 # Minimalistisches PyTorch Dataset
+# Liest die Datei per safe_open (memory-mapped) erst beim Zugriff statt alles in den RAM zu laden.
+# Jeder DataLoader-Worker öffnet die Datei selbst (Handles sind nicht picklebar).
 class TweetDataset(torch.utils.data.Dataset):
+    KEYS = ("input_ids", "attention_mask", "labels")
+
     def __init__(self, path):
-        self.data = load_file(path)
+        self.path = path
+        with safe_open(path, framework="pt") as f:
+            self.length = f.get_slice("labels").get_shape()[0]
+        self._file = None
     def __len__(self):
-        return len(self.data["labels"])
+        return self.length
     def __getitem__(self, idx):
-        return {k: v[idx] for k, v in self.data.items()}
-
-# Modell laden (Trump vs. Musk = 2 Klassen)
-model = AutoModelForSequenceClassification.from_pretrained("vinai/bertweet-base", num_labels=2)
-
-# Training-Konfiguration
-args = TrainingArguments(
-    output_dir="./results",
-    per_device_train_batch_size=64, # Nutzt deinen VRAM effizient
-    num_train_epochs=3,
-    fp16=True,                       # Hardware-Beschleunigung
-    save_strategy="no",              # Spart Zeit
-    report_to="none"
-)
-
-# Trainer starten & Modell speichern
-trainer = Trainer(model=model, args=args, train_dataset=TweetDataset(".data/processed_data.safetensors"))
-trainer.train()
-model.save_pretrained("./final_model")
-print("Training beendet. Modell gespeichert in './final_model'.")
\ No newline at end of file
+        if self._file is None:
+            self._file = safe_open(self.path, framework="pt")
+        return {k: self._file.get_slice(k)[idx:idx + 1][0] for k in self.KEYS}
+    def __getstate__(self):
+        return {**self.__dict__, "_file": None}
+    def lengths(self, chunk=8192):
+        """Echte Länge jeder Zeile (ohne Padding), blockweise aus der attention_mask berechnet."""
+        with safe_open(self.path, framework="pt") as f:
+            mask = f.get_slice("attention_mask")
+            return torch.cat([mask[i:i + chunk].sum(dim=1) for i in range(0, self.length, chunk)])
+
+# Dataset für die Shards aus `tokenizer.py --stream` (ohne Padding: flache IDs + Offsets)
+# Nur offsets und labels liegen im RAM (16 Byte pro Zeile), die Token-IDs werden pro Zeile gelesen.
+class ShardedTweetDataset(torch.utils.data.Dataset):
+    def __init__(self, shard_dir):
+        self.paths = sorted(os.path.join(shard_dir, f) for f in os.listdir(shard_dir) if f.endswith(".safetensors"))
+        if not self.paths:
+            raise FileNotFoundError(f"Keine Shards in {shard_dir} gefunden (erst 'python src/tokenizer.py --stream' ausführen)")
+        self.offsets, self.labels, starts = [], [], [0]
+        for path in self.paths:
+            with safe_open(path, framework="pt") as f:
+                self.offsets.append(f.get_tensor("offsets"))
+                self.labels.append(f.get_tensor("labels"))
+            starts.append(starts[-1] + len(self.labels[-1]))
+        self.starts = starts
+        self._files = None
+    def __len__(self):
+        return self.starts[-1]
+    def locate(self, idx):
+        shard = bisect.bisect_right(self.starts, idx) - 1
+        return shard, idx - self.starts[shard]
+    def lengths(self):
+        return torch.cat([offsets.diff() for offsets in self.offsets])
+    def __getitem__(self, idx):
+        if self._files is None:
+            self._files = [safe_open(p, framework="pt") for p in self.paths]
+        shard, row = self.locate(idx)
+        start, end = int(self.offsets[shard][row]), int(self.offsets[shard][row + 1])
+        input_ids = self._files[shard].get_slice("input_ids")[start:end].long()
+        return {"input_ids": input_ids, "labels": self.labels[shard][row]}
+    def __getstate__(self):
+        return {**self.__dict__, "_files": None}
+
+def pad_collate(features):
+    """
+    Padded die Zeilen eines Batches nur auf die längste Zeile im Batch.
+    Bereits gepaddete Zeilen (TweetDataset) werden vorher anhand der attention_mask gekürzt.
+    """
+    lengths = [int(f["attention_mask"].sum()) if "attention_mask" in f else len(f["input_ids"]) for f in features]
+    max_len = max(lengths)
+    input_ids = torch.full((len(features), max_len), PAD_TOKEN_ID, dtype=torch.long)
+    attention_mask = torch.zeros((len(features), max_len), dtype=torch.long)
+    for i, (f, n) in enumerate(zip(features, lengths)):
+        input_ids[i, :n] = f["input_ids"][:n]
+        attention_mask[i, :n] = 1
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "labels": torch.stack([f["labels"] for f in features]),
+    }
+
+# Sampler, der ähnlich lange Tweets in dieselben Batches legt (weniger Padding)
+# Wie bei HF: zufällig mischen, in Mega-Batches (batch_size * 50) aufteilen, jeden davon nach Länge sortieren.
+class LengthGroupedSampler(torch.utils.data.Sampler):
+    def __init__(self, lengths, batch_size, mega_batch_mult=50, seed=42):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.mega_batch_size = batch_size * mega_batch_mult
+        self.seed = seed
+        self.epoch = 0
+    def __len__(self):
+        return len(self.lengths)
+    def set_epoch(self, epoch):
+        # Vom Trainer aufgerufen: beim Fortsetzen aus einem Checkpoint ergibt sich dieselbe Reihenfolge
+        self.epoch = epoch
+    def __iter__(self):
+        generator = torch.Generator().manual_seed(self.seed + self.epoch)
+        self.epoch += 1
+        indices = torch.randperm(len(self.lengths), generator=generator)
+        for mega in indices.split(self.mega_batch_size):
+            order = torch.argsort(self.lengths[mega], descending=True)
+            yield from mega[order].tolist()
+
+class LengthGroupedTrainer(Trainer):
+    """Trainer, der statt zufälliger Reihenfolge den LengthGroupedSampler verwendet."""
+    def __init__(self, *args, lengths=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lengths = lengths
+    def _get_train_sampler(self, *args, **kwargs):
+        if self.lengths is None:
+            return super()._get_train_sampler(*args, **kwargs)
+        return LengthGroupedSampler(self.lengths, self.args.train_batch_size, seed=self.args.seed)
+
+class ThroughputCallback(TrainerCallback):
+    """Gibt pro Epoche Laufzeit und echte Tokens/s (ohne Padding) aus."""
+    def __init__(self, real_tokens):
+        self.real_tokens = real_tokens
+        self.epoch_start = None
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.epoch_start = time.perf_counter()
+    def on_epoch_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self.epoch_start
+        print(f"Epoche {state.epoch:.0f}: {elapsed:.1f}s | {self.real_tokens / elapsed:,.0f} Tokens/s")
+
+def padded_tokens(lengths, order, batch_size):
+    """Anzahl Token-Positionen, die das Modell bei dieser Batch-Reihenfolge tatsächlich rechnet."""
+    return sum(int(lengths[batch].max()) * len(batch) for batch in torch.tensor(order).split(batch_size))
+
+def resume_checkpoint(output_dir):
+    """Letzter Checkpoint in output_dir (oder None); --fresh verwirft vorhandene Checkpoints."""
+    if "--fresh" in sys.argv:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return None
+    checkpoint = get_last_checkpoint(output_dir) if os.path.isdir(output_dir) else None
+    if checkpoint:
+        print(f"Setze Training fort ab {checkpoint}")
+    return checkpoint
+
+def save_trained_keys(keys):
+    """Menge der gelernten Schlüssel, sortiert gespeichert (Reihenfolge spielt hier keine Rolle)."""
+    save_keys(sorted(keys), TRAINED_KEYS_FILE)
+
+def incremental_dataset(seed=42):
+    """
+    Neue Posts (Text-Hash nicht in TRAINED_KEYS_FILE) plus eine zufällige Stichprobe bereits gelernter Posts.
+    Token-IDs kommen aus dem Token-Cache von tokenizer.py, nur unbekannte Texte werden tokenisiert.
+    Gibt (Liste von Zeilen, alle Schlüssel des Korpus) zurück; None, wenn es nichts Neues gibt.
+    """
+    from corpus import read_corpus
+    from tokenizer import TokenCache, load_tokenizer, tokenizer_fingerprint, text_key, MAX_LENGTH
+
+    df = read_corpus(columns=['label', 'text'], dedup=True)
+    texts, labels = df['text'].astype(str).tolist(), df['label'].to_numpy(dtype='int64')
+    keys = [text_key(t) for t in texts]
+    trained = load_keys(TRAINED_KEYS_FILE)
+    if trained is None:
+        # Ohne gespeicherten Stand: der aktuelle Korpus gilt als gelernt, ab dem nächsten Lauf wird inkrementell trainiert
+        print(f"WARNUNG: Kein Trainingsstand ({TRAINED_KEYS_FILE}) gefunden. Alle {len(keys):,} Posts im aktuellen Korpus "
+              "gelten ab jetzt als gelernt und werden in diesem Lauf NICHT trainiert. Enthält der Korpus Posts, "
+              "die das Basis-Modell noch nicht kennt, vorher einmal `make train` ausführen und diese Datei löschen.")
+        save_trained_keys(set(keys))
+        return None, keys
+
+    new = [i for i, k in enumerate(keys) if k not in trained]
+    if not new:
+        return None, keys
+    old = [i for i, k in enumerate(keys) if k in trained]
+    generator = torch.Generator().manual_seed(seed)
+    n_replay = min(len(old), max(MIN_REPLAY, int(len(new) * REPLAY_RATIO)))
+    replay = [old[i] for i in torch.randperm(len(old), generator=generator)[:n_replay].tolist()]
+    print(f"Inkrementell: {len(new)} neue Posts + {len(replay)} alte zur Wiederholung")
+
+    tokenizer = load_tokenizer()
+    cache = TokenCache(tokenizer_fingerprint(tokenizer))
+    rows = new + replay
+    missing = cache.missing([keys[i] for i in rows])
+    if missing:
+        encoded = tokenizer([texts[rows[j]] for j in missing], truncation=True, max_length=MAX_LENGTH)["input_ids"]
+        for j, ids in zip(missing, encoded):
+            cache.put(keys[rows[j]], ids)
+        cache.flush()
+    dataset = [{"input_ids": torch.from_numpy(cache.get(keys[i]).astype(np.int64)),
+                "labels": torch.tensor(labels[i])} for i in rows]
+    return dataset, keys
+
+if __name__ == "__main__":
+    # CUDA CHECK
+    print(torch.cuda.is_available())
+
+    # python src/Transformer.py --shards        -> Shards aus `tokenizer.py --stream` verwenden
+    # python src/Transformer.py --fixed-padding -> alter Lauf: alles auf die Korpus-Maximallänge gepaddet (zum Vergleich)
+    # python src/Transformer.py --incremental   -> von ./final_model (oder dem veröffentlichten Modell) aus kurz auf neuen Posts weitertrainieren
+    # python src/Transformer.py --fresh         -> vorhandene Checkpoints ignorieren (sonst wird automatisch fortgesetzt)
+    fixed_padding = "--fixed-padding" in sys.argv
+    incremental = "--incremental" in sys.argv
+    batch_size = 64
+
+    if incremental:
+        dataset, corpus_keys = incremental_dataset()
+        if dataset is None:
+            sys.exit("Keine neuen Posts, nichts zu trainieren.")
+        lengths = torch.tensor([len(row["input_ids"]) for row in dataset])
+    elif "--shards" in sys.argv:
+        dataset = ShardedTweetDataset(".data/shards")
+        lengths = dataset.lengths()
+    else:
+        dataset = TweetDataset(".data/processed_data.safetensors")
+        lengths = dataset.lengths()
+
+    if fixed_padding:
+        if not isinstance(dataset, TweetDataset):
+            sys.exit("--fixed-padding funktioniert nur mit .data/processed_data.safetensors")
+        # Zufällige Reihenfolge, jede Zeile auf die Korpus-Maximallänge gepaddet (bisheriges Verhalten)
+        collator, sampler_lengths = None, None
+        computed = len(dataset) * int(dataset[0]["input_ids"].shape[0])
+    else:
+        collator, sampler_lengths = pad_collate, lengths
+        computed = padded_tokens(lengths, list(LengthGroupedSampler(lengths, batch_size)), batch_size)
+    real = int(lengths.sum())
+    print(f"Echte Tokens pro Epoche: {real:,} | berechnete Positionen: {computed:,} (Padding-Anteil {1 - real / computed:.1%})")
+
+    # Modell laden (Trump vs. Musk = 2 Klassen)
+    if incremental:
+        base = FINAL_MODEL if os.path.isdir(FINAL_MODEL) else PUBLISHED_MODEL
+        print(f"Basis-Modell: {base}")
+        model = AutoModelForSequenceClassification.from_pretrained(base, num_labels=2)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained("vinai/bertweet-base", num_labels=2)
+
+    # Training-Konfiguration
+    output_dir = "./results_incremental" if incremental else "./results"
+    epochs = 1 if incremental else 3
+    # Kurze Läufe (z.B. --incremental) haben weniger als SAVE_STEPS Schritte: dann etwa 4 Checkpoints pro Lauf
+    total_steps = math.ceil(len(dataset) / batch_size) * epochs
+    save_steps = max(1, min(SAVE_STEPS, total_steps // 4))
+    print(f"{total_steps} Schritte, Checkpoint alle {save_steps}")
+    args = TrainingArguments(
+        output_dir=output_dir,
+        per_device_train_batch_size=batch_size, # Nutzt deinen VRAM effizient
+        num_train_epochs=epochs,
+        learning_rate=2e-5 if incremental else 5e-5,  # Weitertrainieren: kleinere Schritte
+        fp16=True,                       # Hardware-Beschleunigung
+        save_strategy="steps",           # Checkpoints, damit ein Absturz nicht alles kostet
+        save_steps=save_steps,
+        save_total_limit=2,
+        dataloader_num_workers=0 if incremental else 2,  # Worker öffnen die Datei selbst (memory-mapped)
+        report_to="none"
+    )
+
+    # Trainer starten (ggf. ab dem letzten Checkpoint) & Modell speichern
+    trainer = LengthGroupedTrainer(
+        model=model,
+        args=args,
+        train_dataset=dataset,
+        data_collator=collator,
+        lengths=sampler_lengths,
+        callbacks=[ThroughputCallback(real)],
+    )
+    trainer.train(resume_from_checkpoint=resume_checkpoint(output_dir))
+    model.save_pretrained(FINAL_MODEL)
+
+    # Trainingsstand merken, damit --incremental beim nächsten Mal nur neue Posts nimmt
+    if incremental:
+        save_trained_keys(load_keys(TRAINED_KEYS_FILE) | set(corpus_keys))
+    elif os.path.exists(KEYS_FILE):
+        save_trained_keys(load_keys(KEYS_FILE))
+    shutil.rmtree(output_dir, ignore_errors=True)  # Checkpoints werden nach erfolgreichem Lauf nicht mehr gebraucht
+    print(f"Training beendet. Modell gespeichert in '{FINAL_MODEL}'.")
@@ -0,0 +1,77 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from predict import predict_batch
+import metrics
+
+class QueueFullError(RuntimeError):
+    """Wird geworfen, wenn die Warteschlange voll ist (statt die Latenz unbegrenzt wachsen zu lassen)."""
+
+class MicroBatcher:
+    """
+    Sammelt einzelne predict()-Anfragen, die innerhalb von `max_wait_ms` eintreffen
+    (höchstens `max_batch_size` Stück), und wertet sie gemeinsam mit predict_batch() aus.
+    Jeder Aufrufer bekommt seine eigenen Wahrscheinlichkeiten zurück.
+
+    `max_queue` begrenzt die Anzahl wartender Anfragen; ist sie erreicht, wird sofort
+    QueueFullError geworfen, damit die p99-Latenz begrenzt bleibt.
+    Mit `workers` > 1 sind mehrere Batches gleichzeitig unterwegs (z.B. mit einem ReplicaPool als predict_fn).
+    """
+
+    def __init__(self, predict_fn=predict_batch, max_batch_size=16, max_wait_ms=10, max_queue=256, workers=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._workers = [threading.Thread(target=self._run, name=f"micro-batcher-{i}", daemon=True) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, text):
+        """Reiht einen Text ein und gibt ein Future mit dem Ergebnis-Dictionary zurück."""
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFullError(f"Zu viele Anfragen ({self._queue.maxsize} in der Warteschlange)")
+        return future
+
+    def predict(self, text, timeout=None):
+        """Blockierende Variante von submit(), gleiche Signatur wie predict.predict()."""
+        return self.submit(text).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        # Blockiert bis zur ersten Anfrage, danach höchstens max_wait auf weitere warten
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _, _ in batch]
+            if metrics.ENABLED:
+                now = time.perf_counter()
+                for _, _, queued in batch:
+                    metrics.observe("predict_stage_seconds", now - queued, stage="queue_wait")
+                metrics.observe("batcher_batch_size", len(batch), metrics.SIZE_BUCKETS)
+            try:
+                results = self.predict_fn(texts, batch_size=len(texts))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
\ No newline at end of file
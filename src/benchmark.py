@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import torch
+import pandas as pd
+import predict
+from predict import predict_batch, BACKEND
+from corpus_stats import compute_stats
+from corpus import read_corpus
+
+# Benchmark-Suite (CPU, auf den mitgelieferten data/*.csv):
+#   Einzel-Latenz (p50/p95/p99), Batch-Durchsatz, Tokenizer-Durchsatz, Dashboard-Analyse, Peak-RSS
+# Aufruf: python src/benchmark.py [--texts 512] [--out bench.json]
+#         python src/benchmark.py --compare alt.json neu.json [--threshold 0.10]
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(script_dir, "..", "data")
+CSV_FILES = ["musk_twitter_dataset.csv", "trump_truths_social.csv"]
+BATCH_SIZES = (1, 8, 32, 64)
+
+def load_texts(n):
+    """Nimmt n Texte gemischt aus beiden Datensätzen (feste Seed, damit Läufe vergleichbar sind)."""
+    texts = read_corpus(columns=['text'])['text']
+    return texts.astype(str).sample(n=min(n, len(texts)), random_state=42).tolist()
+
+def predict_fixed(text):
+    """Nachbau der ursprünglichen predict()-Logik: ein Text, immer auf 128 Tokens gepaddet."""
+    inputs = predict.tokenizer(text, return_tensors="pt", truncation=True, padding="max_length", max_length=128)
+    return torch.softmax(predict.run_model(inputs), dim=1)[0]
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: Bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+# ---------- Einzelne Messungen ----------
+# run=predict.run_model umgeht überall den Vorhersage-Cache, sonst wären Wiederholungen reine Cache-Treffer
+
+def bench_latency(texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        predict_batch([text], run=predict.run_model)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"latency_p50_ms": p50, "latency_p95_ms": p95, "latency_p99_ms": p99}
+
+def bench_batch(texts, batch_sizes=BATCH_SIZES):
+    results = {"loop_fixed_padding_per_s": len(texts) / timed(lambda: [predict_fixed(t) for t in texts])}
+    for bs in batch_sizes:
+        results[f"predict_batch_bs{bs}_per_s"] = len(texts) / timed(lambda: predict_batch(texts, batch_size=bs, run=predict.run_model))
+    return results
+
+def bench_tokenizer(texts):
+    return {"tokenize_per_s": len(texts) / timed(lambda: predict.tokenizer(texts, truncation=True, max_length=128))}
+
+def bench_analysis():
+    """Dashboard-Analyse ohne Cache: Korpus-Texte lesen und Statistiken berechnen (plus altes CSV-Parsing zum Vergleich)."""
+    csv_seconds = timed(lambda: [pd.read_csv(os.path.join(DATA_DIR, f)) for f in CSV_FILES])
+    read_corpus(columns=['text'])  # Korpus ggf. bauen, nicht mitmessen
+    parquet_seconds = timed(lambda: read_corpus(columns=['text']))
+    seconds = timed(lambda: [
+        compute_stats(read_corpus(columns=['text'], filters=[('source', '==', os.path.splitext(f)[0])])['text'])
+        for f in CSV_FILES
+    ])
+    return {"load_csv_s": csv_seconds, "load_parquet_s": parquet_seconds, "analysis_s": seconds}
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=script_dir)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def run_suite(n):
+    texts = load_texts(n)
+    metrics = {}
+    metrics.update(bench_analysis())
+    metrics["model_load_s"] = timed(predict.load)
+    metrics.update(bench_tokenizer(texts))
+    metrics.update(bench_latency(texts[:200]))
+    metrics.update(bench_batch(texts))
+    metrics["peak_rss_mb"] = peak_rss_mb()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "backend": BACKEND,
+            "device": predict.device,
+            "threads": torch.get_num_threads(),
+            "texts": len(texts),
+            "platform": platform.platform(),
+        },
+        "metrics": metrics,
+    }
+
+# ---------- Vergleich ----------
+
+def higher_is_better(name):
+    return name.endswith("_per_s")
+
+def compare(old, new, threshold=0.10):
+    """Gibt die Metriken nebeneinander aus und liefert die Namen, die sich um mehr als `threshold` verschlechtert haben."""
+    regressions = []
+    print(f"{'Metrik':<30} {'alt':>12} {'neu':>12} {'Änderung':>10}")
+    for name, new_value in new["metrics"].items():
+        old_value = old["metrics"].get(name)
+        if old_value is None or new_value is None or old_value == 0:
+            continue
+        change = (new_value - old_value) / old_value
+        worse = -change if higher_is_better(name) else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<30} {old_value:12.2f} {new_value:12.2f} {change:+10.1%}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference- und Preprocessing-Benchmarks")
+    parser.add_argument("--texts", type=int, default=512, help="Anzahl Texte aus dem Korpus")
+    parser.add_argument("--out", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", nargs=2, metavar=("ALT", "NEU"), help="Zwei JSON-Läufe vergleichen")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Erlaubte Verschlechterung (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} Regression(en): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nKeine Regressionen.")
+        sys.exit(0)
+
+    results = run_suite(args.texts)
+    meta = results["meta"]
+    print(f"Backend: {meta['backend']} | Device: {meta['device']} | Threads: {meta['threads']} | Texte: {meta['texts']}")
+    for name, value in results["metrics"].items():
+        print(f"{name:<30} {value:12.2f}" if value is not None else f"{name:<30} {'n/a':>12}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Gespeichert: {args.out}")
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import zlib
+import torch
+import torch.nn.functional as F
+from safetensors.torch import save_file, safe_open
+from corpus import read_corpus
+
+# Erste Stufe einer Kaskade vor BERTweet: lineares Modell über gehashte Zeichen- und Wort-n-Gramme (fastText-artig).
+# Ist es sich nach der Kalibrierung (Temperature Scaling) sicher genug, antwortet es direkt,
+# nur unsichere Texte gehen an den Transformer (siehe predict.py, PREDICT_CASCADE=1).
+# Aufruf: python src/cascade.py [--target 0.97]  -> trainieren, kalibrieren, speichern
+#         python src/cascade.py --report         -> Eskalationsrate, Genauigkeit und Latenz gegenüber nur BERTweet
+
+CASCADE_FILE = ".data/cascade.safetensors"
+REPORT_FILE = ".data/cascade_report.json"
+BUCKETS = 2 ** 20
+CHAR_NGRAMS = (2, 3, 4)      # Groß-/Kleinschreibung bleibt erhalten (CAPS sind ein starkes Signal)
+WORD_NGRAMS = (1, 2)         # Wörter klein geschrieben
+TARGET_ACCURACY = 0.97       # Genauigkeit, die die erste Stufe auf den Kalibrierungsdaten erreichen muss
+
+def ngram_ids(text):
+    text = f" {text} "
+    grams = [text[i:i + n] for n in CHAR_NGRAMS for i in range(len(text) - n + 1)]
+    words = text.lower().split()
+    grams += ["w:" + " ".join(words[i:i + n]) for n in WORD_NGRAMS for i in range(len(words) - n + 1)]
+    return [zlib.crc32(g.encode("utf-8")) % BUCKETS for g in grams]
+
+def featurize(texts):
+    """Flache Bucket-IDs + Offsets für nn.EmbeddingBag."""
+    ids, offsets = [], []
+    for text in texts:
+        offsets.append(len(ids))
+        ids.extend(ngram_ids(str(text)))
+    return torch.tensor(ids, dtype=torch.long), torch.tensor(offsets, dtype=torch.long)
+
+class NgramClassifier(torch.nn.Module):
+    def __init__(self, buckets=BUCKETS, num_labels=2):
+        super().__init__()
+        self.weights = torch.nn.EmbeddingBag(buckets, num_labels, mode="mean")
+        self.bias = torch.nn.Parameter(torch.zeros(num_labels))
+        torch.nn.init.zeros_(self.weights.weight)
+
+    def forward(self, ids, offsets):
+        return self.weights(ids, offsets) + self.bias
+
+def split(n, seed=42):
+    """Feste Aufteilung 80/10/10: Training, Kalibrierung, Test (für den Report)."""
+    perm = torch.randperm(n, generator=torch.Generator().manual_seed(seed))
+    a, b = int(n * 0.8), int(n * 0.9)
+    return perm[:a], perm[a:b], perm[b:]
+
+def load_data():
+    df = read_corpus(columns=['label', 'text'], dedup=True)
+    return df['text'].astype(str).tolist(), torch.tensor(df['label'].to_numpy(dtype='int64'))
+
+def logits_for(model, texts, batch_size=4096):
+    with torch.no_grad():
+        return torch.cat([model(*featurize(texts[i:i + batch_size])) for i in range(0, len(texts), batch_size)])
+
+def fit_temperature(logits, labels):
+    """Temperature Scaling: eine Skalierung der Logits, die die NLL auf den Kalibrierungsdaten minimiert."""
+    log_t = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_t], lr=0.1, max_iter=100)
+
+    def closure():
+        optimizer.zero_grad()
+        loss = F.cross_entropy(logits / log_t.exp(), labels)
+        loss.backward()
+        return loss
+    optimizer.step(closure)
+    return float(log_t.exp())
+
+def pick_threshold(probs, labels, target):
+    """Kleinste Konfidenz, ab der alle sichereren Vorhersagen zusammen mindestens `target` Genauigkeit haben."""
+    confidence, predicted = probs.max(dim=1)
+    order = torch.argsort(confidence, descending=True)
+    correct = (predicted[order] == labels[order]).float()
+    accuracy = correct.cumsum(0) / torch.arange(1, len(correct) + 1)
+    ok = torch.nonzero(accuracy >= target).flatten()
+    if len(ok) == 0:
+        return 1.01  # nie direkt antworten
+    return float(confidence[order][ok[-1]])
+
+def train(target=TARGET_ACCURACY, epochs=5, batch_size=256):
+    texts, labels = load_data()
+    train_idx, calib_idx, _ = split(len(texts))
+    model = NgramClassifier()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.05)
+
+    for epoch in range(epochs):
+        start, total = time.perf_counter(), 0.0
+        order = train_idx[torch.randperm(len(train_idx))].tolist()
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            loss = F.cross_entropy(model(*featurize([texts[j] for j in batch])), labels[batch])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += float(loss) * len(batch)
+        print(f"Epoche {epoch + 1}: Loss {total / len(order):.4f} ({time.perf_counter() - start:.1f}s)")
+
+    calib_texts = [texts[i] for i in calib_idx.tolist()]
+    logits = logits_for(model, calib_texts)
+    temperature = fit_temperature(logits, labels[calib_idx])
+    probs = torch.softmax(logits / temperature, dim=1)
+    threshold = pick_threshold(probs, labels[calib_idx], target)
+    answered = float((probs.max(dim=1).values >= threshold).float().mean())
+    print(f"Temperatur {temperature:.3f}, Schwelle {threshold:.4f} -> {answered:.1%} der Kalibrierungsdaten direkt beantwortet")
+
+    os.makedirs(os.path.dirname(CASCADE_FILE), exist_ok=True)
+    save_file({"weights": model.weights.weight.detach(), "bias": model.bias.detach()}, CASCADE_FILE, metadata={
+        "temperature": str(temperature),
+        "threshold": str(threshold),
+        "target": str(target),
+        "buckets": str(BUCKETS),
+    })
+    print(f"Gespeichert: {CASCADE_FILE}")
+
+class Cascade:
+    """Geladene erste Stufe: probs(texts) liefert kalibrierte Wahrscheinlichkeiten, confident() die Maske für direkte Antworten."""
+    def __init__(self, path=CASCADE_FILE):
+        self.path = path
+        with safe_open(path, framework="pt") as f:
+            meta = f.metadata()
+            self.model = NgramClassifier(int(meta["buckets"]))
+            self.model.weights.weight.data = f.get_tensor("weights")
+            self.model.bias.data = f.get_tensor("bias")
+        self.model.eval()
+        self.temperature = float(meta["temperature"])
+        self.threshold = float(meta["threshold"])
+
+    def probs(self, texts):
+        with torch.no_grad():
+            return torch.softmax(self.model(*featurize(texts)) / self.temperature, dim=1)
+
+    def confident(self, probs):
+        return probs.max(dim=1).values >= self.threshold
+
+# ---------- Report ----------
+
+def report(n_latency=500):
+    import predict
+    texts, labels = load_data()
+    _, _, test_idx = split(len(texts))
+    test_texts = [texts[i] for i in test_idx.tolist()]
+    test_labels = labels[test_idx]
+    cascade = Cascade()
+    predict.load()
+
+    fast = cascade.probs(test_texts)
+    confident = cascade.confident(fast)
+    slow = torch.tensor([[r.get("Donald Trump", 0.5), r.get("Elon Musk", 0.5)]
+                         for r in predict.predict_batch(test_texts, run=predict.run_model)])
+    combined = torch.where(confident[:, None], fast, slow)
+
+    def accuracy(probs):
+        return float((probs.argmax(dim=1) == test_labels).float().mean())
+
+    # Latenz pro Einzelanfrage: nur BERTweet vs. Kaskade (Cache umgangen)
+    sample = test_texts[:n_latency]
+    start = time.perf_counter()
+    for text in sample:
+        predict.predict_batch([text], run=predict.run_model)
+    bert_ms = (time.perf_counter() - start) / len(sample) * 1000
+    start = time.perf_counter()
+    for text in sample:
+        if not cascade.confident(cascade.probs([text]))[0]:
+            predict.predict_batch([text], run=predict.run_model)
+    cascade_ms = (time.perf_counter() - start) / len(sample) * 1000
+
+    results = {
+        "test_rows": len(test_texts),
+        "threshold": cascade.threshold,
+        "escalation_rate": 1 - float(confident.float().mean()),
+        "accuracy_ngram_only": accuracy(fast),
+        "accuracy_bertweet": accuracy(slow),
+        "accuracy_cascade": accuracy(combined),
+        "accuracy_delta": accuracy(combined) - accuracy(slow),
+        "latency_bertweet_ms": bert_ms,
+        "latency_cascade_ms": cascade_ms,
+        "speedup": bert_ms / cascade_ms,
+    }
+    for name, value in results.items():
+        print(f"{name:<22} {value:12.4f}")
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Gespeichert: {REPORT_FILE}")
+
+if __name__ == "__main__":
+    if "--report" in sys.argv:
+        report()
+    else:
+        target = float(sys.argv[sys.argv.index("--target") + 1]) if "--target" in sys.argv else TARGET_ACCURACY
+        train(target)
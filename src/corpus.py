@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Kanonischer Spalten-Korpus: einmal aus data/*.csv gebaut, dann von tokenizer.py und dashboard.py gelesen.
+# Spalten: label (int8), text (string), source (Dateiname ohne .csv), id (Zeilennummer innerhalb der Quelle),
+# timestamp (optional, aus den CSVs bisher nicht verfügbar -> null)
+# Aufruf: python src/corpus.py  -> Korpus neu bauen
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(script_dir, "..", "data")
+CORPUS_FILE = ".data/corpus.parquet"
+# Dashboard-Loader lesen den Korpus parallel: Prüfen und Neubauen darf nur einer gleichzeitig
+_prepare_lock = threading.Lock()
+
+SCHEMA = pa.schema([
+    ("label", pa.int8()),
+    ("text", pa.string()),
+    ("source", pa.string()),
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("ms", tz="UTC")),
+])
+
+def csv_files():
+    return [os.path.join(SOURCE_DIR, f) for f in sorted(os.listdir(SOURCE_DIR)) if f.endswith('.csv')]
+
+def source_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+# Gleiche Lese-Optionen und Bereinigung überall, wo CSV-Zeilen ausgewertet werden (auch corpus_stats.py beim Anhängen)
+CSV_OPTIONS = {"on_bad_lines": "skip", "dtype": {"text": str}}
+
+def clean_rows(chunk):
+    """Zeilen ohne Label verwerfen, fehlender Text zählt als leer."""
+    chunk = chunk.dropna(subset=['label'])
+    return chunk.assign(text=chunk['text'].fillna(''))
+
+def build_corpus(path=CORPUS_FILE, chunksize=100_000):
+    """Liest alle CSVs in Chunks (C-Parser) und schreibt sie als eine Parquet-Datei, eine Row-Group pro Chunk."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Eindeutige Temp-Datei im Zielordner, damit parallele Läufe sich nicht gegenseitig die Datei wegnehmen
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+        tmp = f.name
+    total = 0
+    with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as writer:
+        for csv_path in csv_files():
+            offset = 0
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, **CSV_OPTIONS):
+                chunk = clean_rows(chunk)
+                table = pa.table({
+                    "label": chunk['label'].astype('int8').values,
+                    "text": chunk['text'].values,
+                    "source": [source_name(csv_path)] * len(chunk),
+                    "id": range(offset, offset + len(chunk)),
+                    "timestamp": pa.nulls(len(chunk), SCHEMA.field("timestamp").type),
+                }, schema=SCHEMA)
+                writer.write_table(table)
+                offset += len(chunk)
+            total += offset
+    os.replace(tmp, path)
+    print(f"Korpus gebaut: {total} Zeilen -> {path}")
+
+def is_stale(path=CORPUS_FILE):
+    """Neu bauen, wenn der Korpus fehlt oder eine CSV neuer ist."""
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(os.path.getmtime(f) > built for f in csv_files())
+
+def _prepare(path, dedup):
+    with _prepare_lock:
+        # is_stale() erst unter dem Lock: ein zweiter Aufrufer sieht den frisch gebauten Korpus
+        if is_stale(path):
+            build_corpus(path)
+        if dedup:
+            # Dedup-Stufe (src/dedup.py) baut auf dem Korpus auf und wird nur neu berechnet, wenn er neuer ist
+            from dedup import deduplicate
+            return deduplicate(path)
+    return path
+
+def read_corpus(columns=None, filters=None, path=CORPUS_FILE, dedup=False):
+    """
+    Liest nur die angegebenen Spalten, `filters` wird an Parquet weitergereicht (Predicate-Pushdown),
+    z.B. filters=[("source", "==", "trump_truths_social")]. Strings bleiben Arrow-Strings (ohne Python-Objekte).
+    Mit dedup=True ohne Near-Duplicates (für das Training).
+    """
+    path = _prepare(path, dedup)
+    return pd.read_parquet(path, columns=columns, filters=filters, dtype_backend="pyarrow")
+
+def iter_corpus(columns=None, batch_size=2000, path=CORPUS_FILE, dedup=False):
+    """Streamt den Korpus in Batches als DataFrames (für tokenizer.py --stream)."""
+    path = _prepare(path, dedup)
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+if __name__ == "__main__":
+    build_corpus()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+from collections import Counter
+import pandas as pd
+from features import count_features
+from corpus import read_corpus, source_name, clean_rows, CSV_OPTIONS
+
+# Persistenter Cache der Korpus-Statistiken für das Dashboard.
+# Pro CSV wird eine JSON-Datei in .data/ abgelegt, gebunden an den SHA-256 der CSV.
+# Hängt der Scraper nur Zeilen an, werden nur die neuen Zeilen ausgewertet und dazugezählt.
+
+CACHE_DIR = ".data"
+# Erhöhen, wenn sich die Berechnung ändert – alte Caches werden dann verworfen
+STATS_VERSION = 2
+
+def compute_stats(texts):
+    """Zählt Emojis, Mentions, Hashtags und summiert die Stil-Metriken (Summen, damit sie addierbar bleiben)."""
+    return count_features(texts)
+
+def merge_stats(a, b):
+    return {key: a[key] + b[key] for key in a}
+
+def file_hash(path, limit=None):
+    """SHA-256 der Datei, optional nur der ersten `limit` Bytes (für die Anhänge-Erkennung)."""
+    h = hashlib.sha256()
+    remaining = limit if limit is not None else float('inf')
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(int(min(1 << 20, remaining)))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+def _cache_path(csv_path):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(CACHE_DIR, f"stats_{name}.json")
+
+def _load_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != STATS_VERSION:
+        return None
+    stats = data['stats']
+    for key in ('emojis', 'mentions', 'hashtags'):
+        stats[key] = Counter(stats[key])
+    data['stats'] = stats
+    return data
+
+def _save_cache(path, csv_path, stats, sha256):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    data = {
+        'version': STATS_VERSION,
+        'size': os.path.getsize(csv_path),
+        'sha256': sha256,
+        'ends_with_newline': _ends_with_newline(csv_path),
+        'stats': stats,
+    }
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(max(os.path.getsize(path) - 1, 0))
+        return f.read(1) == b'\n'
+
+def load_corpus_stats(csv_path):
+    """
+    Gibt die Statistiken einer CSV zurück:
+    - unveränderte Datei (gleicher Hash): direkt aus dem Cache
+    - nur Zeilen angehängt (Präfix-Hash stimmt): nur die neuen Zeilen auswerten und addieren
+    - sonst: alles neu berechnen
+    """
+    path = _cache_path(csv_path)
+    cached = _load_cache(path)
+    size = os.path.getsize(csv_path)
+    sha256 = file_hash(csv_path)
+
+    if cached and cached['size'] == size and cached['sha256'] == sha256:
+        return cached['stats']
+
+    if (cached and cached['ends_with_newline'] and size > cached['size']
+            and file_hash(csv_path, limit=cached['size']) == cached['sha256']):
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        with open(csv_path, 'rb') as f:
+            f.seek(cached['size'])
+            # Dieselben Optionen wie corpus.build_corpus, sonst weicht das Ergebnis von einer Neuberechnung ab
+            new_rows = clean_rows(pd.read_csv(f, header=None, names=columns, encoding='utf-8', **CSV_OPTIONS))
+        stats = merge_stats(cached['stats'], compute_stats(new_rows['text']))
+        print(f"{os.path.basename(csv_path)}: {len(new_rows)} neue Zeilen ausgewertet")
+    else:
+        # Nur die Textspalte dieser Quelle aus dem Parquet-Korpus lesen (Predicate-Pushdown)
+        texts = read_corpus(columns=['text'], filters=[('source', '==', source_name(csv_path))])['text']
+        stats = compute_stats(texts)
+
+    _save_cache(path, csv_path, stats, sha256)
+    return stats
\ No newline at end of file
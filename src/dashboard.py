@@ -1,65 +1,182 @@
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import gradio as gr
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from predict import predict
-from collections import Counter
-import re
-import emoji
+from batcher import MicroBatcher, QueueFullError
+from corpus_stats import load_corpus_stats
+import threading
+import predict as predictor
+import embeddings
+import search_index
+import metrics
+import timings
+
+# ============== MICRO-BATCHING ==============
+# Requests arriving within BATCH_WAIT_MS are scored together in one padded forward pass
+BATCH_MAX_SIZE = 16
+BATCH_WAIT_MS = 10
+BATCH_MAX_QUEUE = 64
+# Upper bound for one request in the batcher; after that the user gets "server busy" instead of a stack trace
+PREDICT_TIMEOUT_S = 30
+# PREDICT_REPLICAS=N scores batches on N model replicas in separate processes (see replica_pool.py);
+# cache and cascade still run in this process, only the remaining texts go to the replicas
+REPLICAS = int(os.getenv("PREDICT_REPLICAS", "0"))
+replica_pool = None
+
+def create_batcher():
+    global replica_pool
+    if REPLICAS <= 0:
+        return MicroBatcher(max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WAIT_MS, max_queue=BATCH_MAX_QUEUE)
+    from replica_pool import ReplicaPool
+    with timings.phase("replicas"):
+        replica_pool = ReplicaPool(REPLICAS)
+    return MicroBatcher(predict_fn=replica_pool.predict_batch, max_batch_size=BATCH_MAX_SIZE,
+                        max_wait_ms=BATCH_WAIT_MS, max_queue=BATCH_MAX_QUEUE, workers=REPLICAS)
+
+# Replicas are started from __main__ only: spawned worker processes re-import this module
+batcher = create_batcher() if REPLICAS <= 0 else None
+
+def predict(text):
+    # "request" covers queueing + batching + inference, i.e. everything except Gradio's own overhead
+    with metrics.stage("request"):
+        try:
+            return batcher.predict(text, timeout=PREDICT_TIMEOUT_S)
+        except QueueFullError as e:
+            metrics.inc("predict_rejected_total")
+            raise gr.Error(str(e))
+        except FutureTimeoutError:
+            metrics.inc("predict_timeouts_total")
+            raise gr.Error(f"Server busy: no result within {PREDICT_TIMEOUT_S} s, please try again.")
+
+metrics.gauge("batcher_queue_depth", lambda: batcher.queue_depth(), "Requests waiting in the micro-batcher")
+
+# ============== OPS ==============
+METRICS_PORT = os.getenv("PREDICT_METRICS_PORT")
+# Localhost only unless explicitly widened, e.g. PREDICT_METRICS_HOST=0.0.0.0
+METRICS_HOST = os.getenv("PREDICT_METRICS_HOST", "127.0.0.1")
+
+def ops_snapshot():
+    return metrics.summary(), metrics.render()
+
+# ============== SIMILAR POSTS ==============
+# Nearest real posts from the precomputed embedding index (build it with `python src/embeddings.py`)
+SIMILAR_K = 5
+similar_index = None
+similar_lock = threading.Lock()
+
+def load_similar_index():
+    global similar_index
+    with similar_lock:
+        if similar_index is None:
+            try:
+                similar_index = embeddings.EmbeddingIndex()
+            except (FileNotFoundError, ValueError) as e:
+                # Missing index or built for another model: the panel stays empty
+                print(e)
+                similar_index = False
+    return similar_index
+
+def find_similar(text):
+    index = load_similar_index()
+    if not index or not str(text).strip():
+        return None
+    result = index.search(text, k=SIMILAR_K)
+    result["source"] = result["source"].map(lambda s: "Elon Musk" if "musk" in s else "Donald Trump")
+    result["score"] = result["score"].round(3)
+    return result
+
+# ============== SEARCH ==============
+# Inverted index over the corpus (.data/search), updated incrementally with new rows on startup
+AUTHORS = {"All": None, "Elon Musk": "musk_twitter_dataset", "Donald Trump": "trump_truths_social"}
+search = None
+search_error = None
+search_ready = threading.Event()
+search_thread = None
+search_lock = threading.Lock()
+
+def load_search_index():
+    global search, search_error
+    try:
+        with timings.phase("search"):
+            search = search_index.load_index()
+    except Exception as e:
+        search_error = e
+        print(f"Search index failed: {e!r}")
+    finally:
+        search_ready.set()
+
+def start_search(retry=False):
+    global search_thread, search_error
+    with search_lock:
+        # retry=True starts a fresh loader after a failed load instead of reporting the old error forever
+        failed = search_error is not None and not search_thread.is_alive()
+        if search_thread is None or (retry and failed):
+            search_error = None
+            search_ready.clear()
+            search_thread = threading.Thread(target=load_search_index, name="search-loader", daemon=True)
+            search_thread.start()
+    return search_thread
+
+def author_name(source):
+    return "Elon Musk" if "musk" in source else "Donald Trump"
+
+def run_search(query, author):
+    if not str(query).strip():
+        return "*Enter one or more words, #hashtags or @mentions.*", None, None
+    start_search(retry=True)
+    search_ready.wait()
+    if search_error is not None:
+        return f"⚠️ **Search index failed to load:** `{search_error!r}`", None, None
+    result = search.search(query, source=AUTHORS[author])
+
+    lines = ["| Term | " + " | ".join(author_name(s) for s in search.sources) + " |",
+             "|---|" + "---|" * len(search.sources)]
+    for term, counts in result["terms"].items():
+        cells = [f"{counts['posts'][s]:,} posts / {counts['occurrences'][s]:,}×" for s in search.sources]
+        lines.append(f"| `{term}` | " + " | ".join(cells) + " |")
+    matches = ", ".join(f"{author_name(s)}: {n:,}" for s, n in result["matches"].items())
+    summary = "\n".join(lines) + f"\n\n**Posts containing all terms:** {matches}"
+
+    cooccurring = [[term, count] for term, count in result["cooccurring"]]
+    posts = [[author_name(source), text] for source, text in result["posts"]]
+    return summary, cooccurring, posts
 
 # ============== LOAD DATA ==============
-print("Loading data...")
-df_musk = pd.read_csv("data/musk_twitter_dataset.csv")
-df_trump = pd.read_csv("data/trump_truths_social.csv")
+# Loaded in a background thread (see load_analysis) so the UI can start serving immediately
+analysis = None
+charts = None
+analysis_error = None
+analysis_ready = threading.Event()
+analysis_thread = None
+analysis_lock = threading.Lock()
 
 # ============== ANALYSIS FUNCTIONS ==============
-def extract_emojis(text):
-    return [c for c in str(text) if c in emoji.EMOJI_DATA]
+# Counting happens in corpus_stats, which caches the results on disk per CSV hash
+MUSK_CSV = "data/musk_twitter_dataset.csv"
+TRUMP_CSV = "data/trump_truths_social.csv"
 
-def extract_mentions(text):
-    return re.findall(r'@(\w+)', str(text))
-
-def extract_hashtags(text):
-    return re.findall(r'#(\w+)', str(text))
-
-def get_top_items(items, n=10):
-    return Counter(items).most_common(n)
+def get_top_items(counter, n=10):
+    return counter.most_common(n)
 
 def analyze_data():
-    # Extract patterns from both datasets
-    musk_emojis = []
-    musk_mentions = []
-    musk_hashtags = []
-
-    trump_emojis = []
-    trump_mentions = []
-    trump_hashtags = []
-
-    for text in df_musk['text']:
-        musk_emojis.extend(extract_emojis(text))
-        musk_mentions.extend(extract_mentions(text))
-        musk_hashtags.extend(extract_hashtags(text))
-
-    for text in df_trump['text']:
-        trump_emojis.extend(extract_emojis(text))
-        trump_mentions.extend(extract_mentions(text))
-        trump_hashtags.extend(extract_hashtags(text))
+    musk_stats = load_corpus_stats(MUSK_CSV)
+    trump_stats = load_corpus_stats(TRUMP_CSV)
 
     return {
-        'musk_emojis': get_top_items(musk_emojis, 15),
-        'musk_mentions': get_top_items(musk_mentions, 15),
-        'musk_hashtags': get_top_items(musk_hashtags, 15),
-        'trump_emojis': get_top_items(trump_emojis, 15),
-        'trump_mentions': get_top_items(trump_mentions, 15),
-        'trump_hashtags': get_top_items(trump_hashtags, 15),
-        'musk_total': len(df_musk),
-        'trump_total': len(df_trump),
+        'musk_emojis': get_top_items(musk_stats['emojis'], 15),
+        'musk_mentions': get_top_items(musk_stats['mentions'], 15),
+        'musk_hashtags': get_top_items(musk_stats['hashtags'], 15),
+        'trump_emojis': get_top_items(trump_stats['emojis'], 15),
+        'trump_mentions': get_top_items(trump_stats['mentions'], 15),
+        'trump_hashtags': get_top_items(trump_stats['hashtags'], 15),
+        'musk_total': musk_stats['rows'],
+        'trump_total': trump_stats['rows'],
+        'musk_style': musk_stats,
+        'trump_style': trump_stats,
     }
 
-print("Analyzing data patterns...")
-analysis = analyze_data()
-
 # ============== CREATE CHARTS ==============
 def create_emoji_chart():
     fig = make_subplots(rows=1, cols=2, subplot_titles=("Elon Musk - Top Emojis", "Donald Trump - Top Emojis"))
@@ -134,19 +251,14 @@ def create_hashtags_chart():
     )
     return fig
 
-def create_style_comparison():
-    # Calculate style metrics
-    musk_texts = df_musk['text'].astype(str)
-    trump_texts = df_trump['text'].astype(str)
-
-    musk_avg_len = musk_texts.str.len().mean()
-    trump_avg_len = trump_texts.str.len().mean()
+def style_metrics(stats):
+    rows = max(stats['rows'], 1)
+    return stats['chars'] / rows, stats['caps_ratio_sum'] / rows * 100, stats['exclaim'] / rows
 
-    musk_caps_ratio = musk_texts.apply(lambda x: sum(1 for c in x if c.isupper()) / max(len(x), 1)).mean() * 100
-    trump_caps_ratio = trump_texts.apply(lambda x: sum(1 for c in x if c.isupper()) / max(len(x), 1)).mean() * 100
-
-    musk_exclaim = musk_texts.str.count('!').mean()
-    trump_exclaim = trump_texts.str.count('!').mean()
+def create_style_comparison():
+    # Style metrics from the cached per-corpus sums
+    musk_avg_len, musk_caps_ratio, musk_exclaim = style_metrics(analysis['musk_style'])
+    trump_avg_len, trump_caps_ratio, trump_exclaim = style_metrics(analysis['trump_style'])
 
     # Create comparison chart
     categories = ['Avg Length (chars)', 'CAPS Usage (%)', 'Exclamation marks (avg)']
@@ -181,8 +293,50 @@ def create_overview_stats():
 """
     return stats_md
 
+# ============== BACKGROUND LOADING ==============
+def load_analysis():
+    global analysis, charts, analysis_error
+    try:
+        with timings.phase("analysis"):
+            analysis = analyze_data()
+        with timings.phase("charts"):
+            charts = (
+                create_overview_stats(),
+                create_style_comparison(),
+                create_emoji_chart(),
+                create_mentions_chart(),
+                create_hashtags_chart(),
+            )
+    except Exception as e:
+        analysis_error = e
+        print(f"Corpus analysis failed: {e!r}")
+    finally:
+        # Always release waiting page loads, otherwise they hang on a failed analysis
+        analysis_ready.set()
+
+def start_analysis():
+    global analysis_thread
+    with analysis_lock:
+        if analysis_thread is None:
+            analysis_thread = threading.Thread(target=load_analysis, name="analysis-loader", daemon=True)
+            analysis_thread.start()
+    return analysis_thread
+
+def fill_analysis_tab():
+    # Blocks only this page-load event until the background analysis is done
+    start_analysis()
+    analysis_ready.wait()
+    if analysis_error is not None:
+        return f"⚠️ **Corpus analysis failed:** `{analysis_error!r}`", None, None, None, None
+    return charts
+
+def report_when_ready(threads):
+    for thread in threads:
+        thread.join()
+    print(timings.report())
+
 # ============== GRADIO INTERFACE ==============
-with gr.Blocks(title="Trump vs Musk Analyzer", theme=gr.themes.Soft()) as demo:
+with timings.phase("ui"), gr.Blocks(title="Trump vs Musk Analyzer", theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 🔍 Trump vs Musk Analyzer")
     gr.Markdown("BERTweet model fine-tuned to detect authorship + Data Analysis")
 
@@ -201,7 +355,16 @@ with gr.Blocks(title="Trump vs Musk Analyzer", theme=gr.themes.Soft()) as demo:
                 with gr.Column():
                     output_label = gr.Label(label="Prediction", num_top_classes=2)
 
-            predict_btn.click(fn=predict, inputs=text_input, outputs=output_label)
+            similar_table = gr.Dataframe(
+                headers=["source", "text", "score"],
+                label="Most similar real posts",
+                wrap=True,
+                interactive=False
+            )
+
+            # concurrency_limit lets several clicks wait in the batcher at once
+            predict_btn.click(fn=predict, inputs=text_input, outputs=output_label, concurrency_limit=BATCH_MAX_SIZE)
+            predict_btn.click(fn=find_similar, inputs=text_input, outputs=similar_table)
 
             gr.Examples(
                 examples=[
@@ -215,19 +378,60 @@ with gr.Blocks(title="Trump vs Musk Analyzer", theme=gr.themes.Soft()) as demo:
 
         # Tab 2: Data Analysis
         with gr.TabItem("📊 Data Analysis"):
-            gr.Markdown(create_overview_stats())
+            overview_md = gr.Markdown("*Loading data analysis...*")
+
+            with gr.Row():
+                style_plot = gr.Plot()
 
             with gr.Row():
-                gr.Plot(create_style_comparison())
+                emoji_plot = gr.Plot()
 
             with gr.Row():
-                gr.Plot(create_emoji_chart())
+                mentions_plot = gr.Plot()
 
             with gr.Row():
-                gr.Plot(create_mentions_chart())
+                hashtags_plot = gr.Plot()
 
+        # Tab 3: Search
+        with gr.TabItem("🔎 Search"):
+            with gr.Row():
+                search_input = gr.Textbox(label="Search terms", placeholder="e.g. tesla, #maga, @elonmusk", scale=3)
+                search_author = gr.Dropdown(choices=list(AUTHORS), value="All", label="Author", scale=1)
+            search_btn = gr.Button("Search", variant="primary")
+            search_summary = gr.Markdown()
             with gr.Row():
-                gr.Plot(create_hashtags_chart())
+                search_cooccurring = gr.Dataframe(headers=["co-occurring term", "posts"], interactive=False, scale=1)
+                search_posts = gr.Dataframe(headers=["author", "text"], wrap=True, interactive=False, scale=3)
+            search_outputs = [search_summary, search_cooccurring, search_posts]
+            search_btn.click(fn=run_search, inputs=[search_input, search_author], outputs=search_outputs)
+            search_input.submit(fn=run_search, inputs=[search_input, search_author], outputs=search_outputs)
+
+        # Tab 4: Ops
+        with gr.TabItem("🛠️ Ops"):
+            gr.Markdown("Per-stage latency of the predict path (bucket-based estimates). Disable with `PREDICT_METRICS=0`.")
+            ops_refresh = gr.Button("Refresh")
+            ops_table = gr.Dataframe(
+                headers=["metric", "labels", "count", "mean", "~p50", "~p95"],
+                interactive=False
+            )
+            ops_raw = gr.Code(label="Prometheus text", language=None)
+            ops_refresh.click(fn=ops_snapshot, outputs=[ops_table, ops_raw])
+
+    demo.load(
+        fn=fill_analysis_tab,
+        outputs=[overview_md, style_plot, emoji_plot, mentions_plot, hashtags_plot]
+    )
 
 if __name__ == "__main__":
-    demo.launch()
+    # Model and corpus analysis load in the background; the server starts right away
+    # (with replicas the model lives in the worker processes; here only tokenizer, cascade and cache are loaded)
+    if batcher is None:
+        batcher = create_batcher()
+    similar_loader = threading.Thread(target=load_similar_index, name="similar-loader", daemon=True)
+    similar_loader.start()
+    loaders = [start_analysis(), similar_loader, start_search()]
+    loaders.append(predictor.warmup(model=replica_pool is None))
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT), host=METRICS_HOST)
+    threading.Thread(target=report_when_ready, args=(loaders,), daemon=True).start()
+    demo.queue(max_size=BATCH_MAX_QUEUE).launch()
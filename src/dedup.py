@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Near-Duplicate-Erkennung zwischen Korpus und Tokenizer (MinHash + LSH-Banding):
+# - Text normalisieren (klein, ohne URLs, ohne "RT @user:"-Präfix), Zeichen-5-Gramme als Shingles
+# - 128 MinHash-Werte pro Post, parallel in Chunks berechnet
+# - LSH: 16 Bänder à 8 Werte; Posts im selben Bucket werden mit dem ersten Bucket-Mitglied verglichen
+#   und bei geschätzter Jaccard-Ähnlichkeit >= THRESHOLD zu einem Cluster vereinigt (Union-Find)
+# - pro Cluster und Label bleibt der erste Post erhalten; Posts ohne Text (nur Links) bilden einen eigenen Cluster
+# Ergebnis: .data/corpus_dedup.parquet (gleiches Schema wie der Korpus) + Bericht .data/dedup_report.json
+# Aufruf: python src/dedup.py [--workers N]  (sonst automatisch über read_corpus(..., dedup=True))
+
+DEDUP_FILE = ".data/corpus_dedup.parquet"
+REPORT_FILE = ".data/dedup_report.json"
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+THRESHOLD = 0.8
+CHUNK_ROWS = 5000
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+|t\.co/\S+")
+RT_PATTERN = re.compile(r"^rt @\w+:?\s*")
+
+# Feste Seed: alle Worker-Prozesse erzeugen dieselben Hash-Funktionen
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+def normalize(text):
+    text = URL_PATTERN.sub(" ", str(text).lower()).strip()
+    return " ".join(RT_PATTERN.sub("", text).split())
+
+def shingle_hashes(text):
+    """64-Bit-Hashes aller Zeichen-Shingles (Polynom-Hash, vektorisiert über die Codepoints)."""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE:
+        codes = np.concatenate([codes, np.zeros(SHINGLE - len(codes), dtype=np.uint64)])
+    n = len(codes) - SHINGLE + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(SHINGLE):
+        h = h * np.uint64(1_000_003) + codes[j:j + n]
+    return np.unique(h)
+
+def _signatures(texts):
+    """Läuft im Worker: MinHash-Signaturen (len(texts), NUM_PERM) als uint32 (Multiply-Shift-Hashing)."""
+    out = np.full((len(texts), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for i, text in enumerate(texts):
+        if text:
+            h = shingle_hashes(text)
+            out[i] = ((_A[:, None] * h[None, :] + _B[:, None]) >> np.uint64(32)).min(axis=1)
+    return out
+
+def signatures(texts, workers=None):
+    chunks = [texts[i:i + CHUNK_ROWS] for i in range(0, len(texts), CHUNK_ROWS)]
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(chunks) <= 1:
+        parts = [_signatures(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_signatures, chunks))
+    return np.concatenate(parts) if parts else np.zeros((0, NUM_PERM), dtype=np.uint32)
+
+def find_clusters(sigs, candidates):
+    """Union-Find über LSH-Kandidaten; gibt für jede Zeile die Cluster-Wurzel zurück."""
+    parent = np.arange(len(sigs))
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    candidates = np.asarray(candidates)
+    for band in range(BANDS):
+        keys = np.ascontiguousarray(sigs[candidates, band * ROWS:(band + 1) * ROWS])
+        keys = keys.view(np.dtype((np.void, ROWS * keys.itemsize))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if counts.max(initial=0) < 2:
+            continue
+        order = np.argsort(inverse, kind="stable")
+        for bucket in np.split(candidates[order], np.cumsum(counts)[:-1]):
+            if len(bucket) < 2:
+                continue
+            first = bucket[0]
+            similarity = (sigs[bucket[1:]] == sigs[first]).mean(axis=1)
+            for member in bucket[1:][similarity >= THRESHOLD]:
+                a, b = find(first), find(member)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+    return np.array([find(i) for i in range(len(sigs))])
+
+def is_stale(corpus_path, path=DEDUP_FILE):
+    return not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(corpus_path)
+
+def deduplicate(corpus_path, path=DEDUP_FILE, workers=None, force=False):
+    """Schreibt den deduplizierten Korpus (nur wenn er älter als der Korpus ist) und gibt seinen Pfad zurück."""
+    if not force and not is_stale(corpus_path, path):
+        return path
+    start = time.perf_counter()
+    table = pq.read_table(corpus_path)
+    texts = [normalize(t) for t in table.column("text").to_pylist()]
+    labels = table.column("label").to_numpy()
+    sources = table.column("source").to_pylist()
+
+    sigs = signatures(texts, workers)
+    nonempty = [i for i, t in enumerate(texts) if t]
+    roots = find_clusters(sigs, nonempty)
+    # Posts ohne Text (nur Links/Leerzeichen) gemeinsam als ein Cluster
+    empty = [i for i, t in enumerate(texts) if not t]
+    if empty:
+        roots[empty] = empty[0]
+
+    # Pro Cluster und Label den ersten Post behalten
+    members = defaultdict(list)
+    for i, root in enumerate(roots):
+        members[root].append(i)
+    keep = np.zeros(len(texts), dtype=bool)
+    clusters = []
+    for root, rows in members.items():
+        kept_labels = set()
+        for i in rows:
+            if labels[i] not in kept_labels:
+                kept_labels.add(labels[i])
+                keep[i] = True
+        if len(rows) > 1:
+            clusters.append(rows)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+        tmp = f.name
+    pq.write_table(table.filter(pa.array(keep)), tmp, compression="zstd")
+    os.replace(tmp, path)
+
+    original = table.column("text").to_pylist()
+    write_report(clusters, keep, sources, labels, original, empty, time.perf_counter() - start)
+    return path
+
+def write_report(clusters, keep, sources, labels, texts, empty, seconds, top=100):
+    removed_by_source = defaultdict(int)
+    for i in np.flatnonzero(~keep):
+        removed_by_source[sources[i]] += 1
+    clusters.sort(key=len, reverse=True)
+    report = {
+        "rows": len(keep),
+        "kept": int(keep.sum()),
+        "removed": int((~keep).sum()),
+        "removed_by_source": dict(removed_by_source),
+        "clusters": len(clusters),
+        "cross_label_clusters": sum(len({labels[i] for i in rows}) > 1 for rows in clusters),
+        "empty_after_normalization": len(empty),
+        "threshold": THRESHOLD,
+        "seconds": round(seconds, 2),
+        "largest_clusters": [{
+            "size": len(rows),
+            "removed": int((~keep[rows]).sum()),
+            "sources": sorted({sources[i] for i in rows}),
+            "kept": texts[rows[0]],
+            "examples": [texts[i] for i in rows[1:6]],
+        } for rows in clusters[:top]],
+    }
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Dedup: {report['removed']} von {report['rows']} Posts entfernt ({report['clusters']} Cluster, "
+          f"{seconds:.1f}s) -> Bericht {REPORT_FILE}")
+
+if __name__ == "__main__":
+    from corpus import CORPUS_FILE, is_stale as corpus_is_stale, build_corpus
+    if corpus_is_stale():
+        build_corpus()
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else None
+    deduplicate(CORPUS_FILE, workers=workers, force=True)
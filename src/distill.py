@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import RobertaForSequenceClassification, TrainingArguments
+from Transformer import TweetDataset, ShardedTweetDataset, LengthGroupedTrainer, ThroughputCallback, pad_collate
+import predict
+
+# Knowledge Distillation: kleines Schüler-Modell (Standard: 4 statt 12 Layer) lernt die weichen
+# Wahrscheinlichkeiten des feinjustierten Lehrers (predict.model_id) auf den vorbereiteten Trainingsdaten.
+# Der Schüler startet mit Embeddings, gleichmäßig ausgewählten Layern und Klassifikationskopf des Lehrers.
+# Aufruf: python src/distill.py [--shards] [--layers 4]  -> trainiert und speichert in ./student_model
+#         python src/distill.py --report [--shards]      -> Genauigkeit, Latenz, Speicher Lehrer vs. Schüler
+# Im Dashboard/predict.py verwenden: PREDICT_MODEL=./student_model
+
+STUDENT_DIR = "./student_model"
+REPORT_FILE = ".data/distill_report.json"
+EVAL_FRACTION = 0.05      # zurückgehaltener Anteil für den Report (feste Seed)
+TEMPERATURE = 2.0
+ALPHA = 0.7               # Gewicht des Distillation-Loss gegenüber den harten Labels
+
+def load_dataset():
+    if "--shards" in sys.argv:
+        return ShardedTweetDataset(".data/shards")
+    return TweetDataset(".data/processed_data.safetensors")
+
+def split(dataset, seed=42):
+    """Deterministische Aufteilung in Trainings- und Report-Indizes."""
+    perm = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(seed))
+    n_eval = max(1, int(len(dataset) * EVAL_FRACTION))
+    return perm[n_eval:], perm[:n_eval]
+
+def load_teacher():
+    teacher = RobertaForSequenceClassification.from_pretrained(predict.model_id, revision=predict.revision, token=predict.hf_token)
+    teacher.eval()
+    return teacher
+
+def make_student(teacher, num_layers=4):
+    """Gleiche Architektur mit weniger Layern; Gewichte werden aus dem Lehrer übernommen."""
+    config = teacher.config.to_dict()
+    config["num_hidden_layers"] = num_layers
+    student = RobertaForSequenceClassification(type(teacher.config).from_dict(config))
+
+    keep = np.linspace(0, teacher.config.num_hidden_layers - 1, num_layers).round().astype(int).tolist()
+    student.roberta.embeddings.load_state_dict(teacher.roberta.embeddings.state_dict())
+    for i, layer in enumerate(keep):
+        student.roberta.encoder.layer[i].load_state_dict(teacher.roberta.encoder.layer[layer].state_dict())
+    student.classifier.load_state_dict(teacher.classifier.state_dict())
+    print(f"Schüler: Layer {keep} des Lehrers, {count_params(student) / 1e6:.1f}M statt {count_params(teacher) / 1e6:.1f}M Parameter")
+    return student
+
+def count_params(model):
+    return sum(p.numel() for p in model.parameters())
+
+class DistillationTrainer(LengthGroupedTrainer):
+    """Loss = ALPHA * KL(Schüler || Lehrer) bei Temperatur T + (1 - ALPHA) * Cross-Entropy mit den echten Labels."""
+    def __init__(self, *args, teacher=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.to(self.args.device)
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        labels = inputs.pop("labels")
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(**inputs).logits
+        soft = F.kl_div(
+            F.log_softmax(outputs.logits / TEMPERATURE, dim=-1),
+            F.softmax(teacher_logits / TEMPERATURE, dim=-1),
+            reduction="batchmean",
+        ) * TEMPERATURE ** 2
+        hard = F.cross_entropy(outputs.logits, labels)
+        loss = ALPHA * soft + (1 - ALPHA) * hard
+        return (loss, outputs) if return_outputs else loss
+
+def train(num_layers):
+    dataset = load_dataset()
+    train_idx, _ = split(dataset)
+    lengths = dataset.lengths()[train_idx]
+    train_set = torch.utils.data.Subset(dataset, train_idx.tolist())
+
+    teacher = load_teacher()
+    student = make_student(teacher, num_layers)
+
+    args = TrainingArguments(
+        output_dir="./results_distill",
+        per_device_train_batch_size=64,
+        num_train_epochs=3,
+        learning_rate=1e-4,              # Schüler ist kleiner und schon vorinitialisiert
+        fp16=torch.cuda.is_available(),
+        save_strategy="no",
+        dataloader_num_workers=2,
+        report_to="none",
+    )
+    trainer = DistillationTrainer(
+        model=student,
+        args=args,
+        train_dataset=train_set,
+        data_collator=pad_collate,
+        lengths=lengths,
+        teacher=teacher,
+        callbacks=[ThroughputCallback(int(lengths.sum()))],
+    )
+    trainer.train()
+    student.save_pretrained(STUDENT_DIR)
+    print(f"Distillation beendet. Schüler gespeichert in '{STUDENT_DIR}'.")
+
+# ---------- Report ----------
+
+def evaluate(model, dataset, indices, batch_size=64):
+    """Genauigkeit auf den zurückgehaltenen Zeilen (CPU, nach Länge sortiert)."""
+    lengths = dataset.lengths()[indices]
+    order = indices[torch.argsort(lengths)].tolist()
+    correct = 0
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            batch = pad_collate([dataset[i] for i in order[start:start + batch_size]])
+            labels = batch.pop("labels")
+            correct += int((model(**batch).logits.argmax(dim=-1) == labels).sum())
+    return correct / len(order)
+
+def latency(model, dataset, indices, n=200, batch_size=32):
+    """p50/p95 für Einzelanfragen und Durchsatz im Batch, jeweils auf der CPU."""
+    rows = [dataset[i] for i in indices[:n].tolist()]
+    single = []
+    with torch.no_grad():
+        for row in rows:
+            batch = pad_collate([row])
+            batch.pop("labels")
+            start = time.perf_counter()
+            model(**batch)
+            single.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        for i in range(0, len(rows), batch_size):
+            batch = pad_collate(rows[i:i + batch_size])
+            batch.pop("labels")
+            model(**batch)
+        per_s = len(rows) / (time.perf_counter() - start)
+    p50, p95 = np.percentile(single, [50, 95])
+    return {"latency_p50_ms": p50, "latency_p95_ms": p95, f"batch{batch_size}_per_s": per_s}
+
+def memory(model):
+    return {"params_m": count_params(model) / 1e6,
+            "weights_mb": sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 ** 2}
+
+def report():
+    dataset = load_dataset()
+    _, eval_idx = split(dataset)
+    models = {
+        "teacher": load_teacher(),
+        "student": RobertaForSequenceClassification.from_pretrained(STUDENT_DIR).eval(),
+    }
+    results = {}
+    for name, model in models.items():
+        model.to("cpu")
+        results[name] = {"accuracy": evaluate(model, dataset, eval_idx), **latency(model, dataset, eval_idx), **memory(model)}
+
+    print(f"Zurückgehaltene Zeilen: {len(eval_idx)} (der Lehrer hat sie evtl. im Training gesehen)")
+    print(f"{'Metrik':<20} {'Lehrer':>12} {'Schüler':>12}")
+    for metric in results["teacher"]:
+        print(f"{metric:<20} {results['teacher'][metric]:12.3f} {results['student'][metric]:12.3f}")
+
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"eval_rows": len(eval_idx), "threads": torch.get_num_threads(), **results}, f, indent=2)
+    print(f"Gespeichert: {REPORT_FILE}")
+
+if __name__ == "__main__":
+    if "--report" in sys.argv:
+        report()
+    else:
+        layers = int(sys.argv[sys.argv.index("--layers") + 1]) if "--layers" in sys.argv else 4
+        train(layers)
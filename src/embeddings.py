@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+import torch
+import predict
+from corpus import read_corpus
+
+# Embedding-Index für "ähnlichste echte Posts":
+# - Mean-Pooling über die letzte Schicht desselben Modells, das predict.py lädt (ohne Klassifikationskopf, gleiche Gewichte)
+# - Vektoren L2-normalisiert als float16 in einer Memmap-Datei, Skalarprodukt = Kosinus-Ähnlichkeit
+# - Zeilen-Metadaten (source, text, key) in rows.parquet, key = SHA-1 des Textes
+# - update_index() kodiert nur Texte, die noch nicht im Index sind, und hängt sie an die Memmap an
+# Aufruf: python src/embeddings.py  -> Index bauen bzw. aktualisieren
+
+INDEX_DIR = ".data/embeddings"
+VECTORS_FILE = os.path.join(INDEX_DIR, "vectors.f16")
+ROWS_FILE = os.path.join(INDEX_DIR, "rows.parquet")
+META_FILE = os.path.join(INDEX_DIR, "meta.json")
+DTYPE = np.float16
+BATCH_SIZE = 64
+SEARCH_BLOCK = 16384  # Zeilen pro Block bei der Suche (float16 -> float32 nur blockweise)
+
+encoder = None
+_encoder_lock = threading.Lock()
+
+def load_encoder():
+    """
+    BERTweet-Encoder ohne Klassifikationskopf (einmalig, thread-sicher). Nutzt das von predict.py geladene
+    fp32-Modell mit, statt die Gewichte ein zweites Mal zu laden; nur bei anderem Backend (int8, onnx) eigene Kopie.
+    """
+    global encoder
+    with _encoder_lock:
+        if encoder is None:
+            if predict.torch_model is None and predict.BACKEND == "torch":
+                predict.load()
+            m = predict.torch_model
+            if m is None:
+                m, _ = predict.load_torch_model("torch", target="cpu")
+            encoder = m.roberta
+    return encoder
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def embed(texts, batch_size=BATCH_SIZE):
+    """Gibt L2-normalisierte, mean-gepoolte Embeddings als float32-Array (len(texts), hidden) zurück."""
+    tokenizer = predict.load_tokenizer()
+    m = load_encoder()
+    device = next(m.parameters()).device
+    encoded = tokenizer([str(t) for t in texts], truncation=True, max_length=predict.MAX_LENGTH)["input_ids"]
+    order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+    out = np.zeros((len(texts), m.config.hidden_size), dtype=np.float32)
+
+    for start in range(0, len(order), batch_size):
+        chunk = order[start:start + batch_size]
+        inputs = tokenizer.pad([{"input_ids": encoded[i]} for i in chunk], padding="longest", return_tensors="pt").to(device)
+        with torch.no_grad():
+            hidden = m(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        out[chunk] = torch.nn.functional.normalize(pooled, dim=1).cpu().numpy()
+    return out
+
+# ---------- Index ----------
+
+def _read_meta():
+    if not os.path.exists(META_FILE):
+        return None
+    with open(META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_meta(meta):
+    tmp = META_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, META_FILE)
+
+def update_index(chunk_rows=4096):
+    """
+    Bringt den Index auf den Stand des Korpus. Neue Texte (z.B. frisch gescrapte Posts) werden
+    kodiert und angehängt; hat sich das Modell geändert (Fingerprint), wird alles neu gebaut.
+    """
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    fingerprint = predict.model_fingerprint("torch")
+    meta = _read_meta()
+    if meta is None or meta["model"] != fingerprint or not meta["count"] \
+            or not os.path.exists(ROWS_FILE) or not os.path.exists(VECTORS_FILE):
+        for path in (VECTORS_FILE, ROWS_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        rows = pd.DataFrame({"source": pd.Series(dtype=str), "text": pd.Series(dtype=str), "key": pd.Series(dtype=str)})
+        meta = {"model": fingerprint, "dim": None, "count": 0}
+    else:
+        rows = pd.read_parquet(ROWS_FILE)
+        # Abgebrochener Lauf: Vektordatei kann länger sein als die gespeicherten Zeilen
+        with open(VECTORS_FILE, "r+b") as f:
+            f.truncate(meta["count"] * meta["dim"] * np.dtype(DTYPE).itemsize)
+        rows = rows.iloc[:meta["count"]]
+
+    corpus = read_corpus(columns=["source", "text"])
+    corpus = pd.DataFrame({"source": corpus["source"].astype(str), "text": corpus["text"].astype(str)})
+    corpus = corpus[corpus["text"].str.strip() != ""]
+    corpus["key"] = [text_key(t) for t in corpus["text"]]
+    new = corpus[~corpus["key"].isin(set(rows["key"]))].drop_duplicates("key")
+    if new.empty:
+        print(f"Index aktuell: {meta['count']} Posts.")
+        return meta["count"]
+
+    print(f"Kodiere {len(new)} neue Posts...")
+    with open(VECTORS_FILE, "ab") as f:
+        for start in range(0, len(new), chunk_rows):
+            part = new.iloc[start:start + chunk_rows]
+            vectors = embed(part["text"].tolist())
+            f.write(vectors.astype(DTYPE).tobytes())
+            f.flush()
+            meta["dim"] = vectors.shape[1]
+            meta["count"] += len(part)
+            rows = pd.concat([rows, part], ignore_index=True)
+            # Zeilen und Meta nach jedem Chunk sichern -> ein Abbruch verliert höchstens einen Chunk
+            rows.to_parquet(ROWS_FILE, index=False)
+            _write_meta(meta)
+            print(f"  {meta['count']} Posts im Index", end="\r")
+    print(f"\nIndex gespeichert: {meta['count']} Posts unter {INDEX_DIR}")
+    return meta["count"]
+
+class EmbeddingIndex:
+    """Nur-Lese-Sicht auf den Index: Memmap der Vektoren + Metadaten, Top-k-Suche per Skalarprodukt."""
+
+    def __init__(self):
+        meta = _read_meta()
+        if meta is None or meta["count"] == 0:
+            raise FileNotFoundError(f"Kein Embedding-Index unter {INDEX_DIR}, erst `python src/embeddings.py` ausführen.")
+        # Mit einem anderen Modell (z.B. PREDICT_MODEL=./student_model) wären die Nachbarn falsch
+        fingerprint = predict.model_fingerprint("torch")
+        if meta["model"] != fingerprint:
+            raise ValueError(f"Embedding-Index gehört zu {meta['model']}, geladen ist {fingerprint}; "
+                             "`python src/embeddings.py` neu ausführen.")
+        self.meta = meta
+        self.vectors = np.memmap(VECTORS_FILE, dtype=DTYPE, mode="r", shape=(meta["count"], meta["dim"]))
+        self.rows = pd.read_parquet(ROWS_FILE).iloc[:meta["count"]].reset_index(drop=True)
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def search_vector(self, query, k=5):
+        """Gibt (indices, scores) der k ähnlichsten Zeilen zurück, absteigend sortiert."""
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SEARCH_BLOCK):
+            block = self.vectors[start:start + SEARCH_BLOCK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def search(self, text, k=5):
+        """Ähnlichste Korpus-Posts zu `text` als DataFrame (source, text, score)."""
+        indices, scores = self.search_vector(embed([text])[0], k)
+        result = self.rows.iloc[indices][["source", "text"]].reset_index(drop=True)
+        result["score"] = scores
+        return result
+
+if __name__ == "__main__":
+    update_index()
+    index = EmbeddingIndex()
+    print(index.search("We will make America great again!", k=3).to_string())
@@ -0,0 +1,70 @@
+import os
+import sys
+import torch
+from transformers import RobertaForSequenceClassification
+from predict import model_id, revision, hf_token, ONNX_PATH, load_model, predict_batch
+from benchmark import load_texts
+
+# Exportiert das Modell für die CPU-Backends und prüft, dass die Wahrscheinlichkeiten nicht abdriften.
+# Aufruf: python src/export_model.py            -> ONNX exportieren + Parity-Check (onnx, int8)
+#         python src/export_model.py --check    -> nur Parity-Check
+#         python src/export_model.py --quantize -> zusätzlich int8-ONNX (model.int8.onnx) schreiben
+
+# Maximal erlaubte Abweichung der Wahrscheinlichkeiten gegenüber fp32
+TOLERANCE = {"onnx": 1e-3, "int8": 0.05}
+
+def export_onnx(path=ONNX_PATH, revision=revision):
+    # Dieselbe Revision wie predict.py (PREDICT_REVISION), sonst passt der Fingerprint nicht zum exportierten Modell
+    model = RobertaForSequenceClassification.from_pretrained(model_id, revision=revision, token=hf_token)
+    model.eval()
+    model.config.return_dict = False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dummy = {
+        "input_ids": torch.ones(2, 16, dtype=torch.long),
+        "attention_mask": torch.ones(2, 16, dtype=torch.long),
+    }
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        # Batchgröße und Sequenzlänge bleiben dynamisch (für predict_batch)
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=17,
+    )
+    print(f"ONNX exportiert: {path}")
+
+def quantize_onnx(path=ONNX_PATH):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    out = path.replace(".onnx", ".int8.onnx")
+    quantize_dynamic(path, out, weight_type=QuantType.QInt8)
+    print(f"int8-ONNX geschrieben: {out} (nutzen mit PREDICT_ONNX_PATH={out})")
+
+def parity_check(backends=("onnx", "int8"), n=256):
+    """Vergleicht jedes Backend mit fp32 auf n Korpus-Texten. Gibt False zurück, wenn eines abdriftet."""
+    texts = load_texts(n)
+    reference = predict_batch(texts, run=load_model("torch")[0])
+
+    ok = True
+    for backend in backends:
+        results = predict_batch(texts, run=load_model(backend)[0])
+        diff = max(abs(r["Elon Musk"] - ref["Elon Musk"]) for r, ref in zip(results, reference))
+        agree = sum((r["Elon Musk"] > 0.5) == (ref["Elon Musk"] > 0.5) for r, ref in zip(results, reference)) / len(texts)
+        passed = diff <= TOLERANCE[backend]
+        ok = ok and passed
+        print(f"{backend:<5} max. Abweichung: {diff:.5f} (Toleranz {TOLERANCE[backend]}) | gleiche Klasse: {agree:.2%} | {'OK' if passed else 'FEHLER'}")
+    return ok
+
+if __name__ == "__main__":
+    if "--check" not in sys.argv:
+        export_onnx()
+        if "--quantize" in sys.argv:
+            quantize_onnx()
+    if not parity_check():
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import re
+import sys
+import time
+import functools
+from collections import Counter
+import emoji
+import pandas as pd
+
+# Vektorisierte Feature-Extraktion für das Dashboard.
+# count_features() zählt direkt über alle Posts (Länge, CAPS-Anteil, "!", Emojis, Mentions, Hashtags),
+# ohne pro Post Python-Listen zu bauen; corpus_stats.py speichert das Ergebnis.
+# Benchmark gegen die alte Schleife: python src/features.py
+
+def _char_class(chars):
+    """Baut aus einer Zeichenmenge eine kompakte Regex-Zeichenklasse mit Bereichen (a-z statt abc...z)."""
+    codes = sorted(ord(c) for c in chars)
+    parts = []
+    start = prev = codes[0]
+    for code in codes[1:] + [None]:
+        if code is not None and code == prev + 1:
+            prev = code
+            continue
+        parts.append(re.escape(chr(start)) if start == prev else f"{re.escape(chr(start))}-{re.escape(chr(prev))}")
+        if code is not None:
+            start = prev = code
+    return "[" + "".join(parts) + "]"
+
+# Gleiche Semantik wie die alten Funktionen: einzelne Zeichen aus emoji.EMOJI_DATA bzw. str.isupper()
+EMOJI_CHARS = frozenset(e for e in emoji.EMOJI_DATA if len(e) == 1)
+MENTION_PATTERN = r'@(\w+)'
+HASHTAG_PATTERN = r'#(\w+)'
+NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+@functools.lru_cache(maxsize=1)
+def upper_pattern():
+    """Zeichenklasse aller Großbuchstaben; erst beim ersten Bedarf gebaut (Scan über alle Codepoints, je nach Rechner bis ~0.7s)."""
+    return _char_class(chr(i) for i in range(sys.maxunicode + 1) if chr(i).isupper())
+
+def count_features(texts):
+    """
+    Summen und Zähler über eine Serie von Texten:
+    rows, chars, caps_ratio_sum (Summe der CAPS-Anteile pro Post), exclaim und Counter für emojis, mentions, hashtags.
+    Gezählt wird auf einem einzigen, mit Zeilenumbrüchen verbundenen String (\\w passt nicht über "\\n" hinweg).
+    Emojis: nur Nicht-ASCII-Zeichen zählen und danach auf Emoji-Zeichen filtern; die große Emoji-Zeichenklasse
+    als Regex wäre etwa 15x langsamer.
+    """
+    # Fehlende Texte als leer zählen (astype(str) lässt NaN unter pandas 3 stehen)
+    texts = pd.Series(texts).fillna('').astype(str)
+    length = texts.str.len()
+    joined = "\n".join(texts.tolist())
+    non_ascii = Counter(NON_ASCII.findall(joined))
+    return {
+        'rows': len(texts),
+        'chars': int(length.sum()),
+        'caps_ratio_sum': float((texts.str.count(upper_pattern()) / length.clip(lower=1)).sum()),
+        'exclaim': joined.count('!'),
+        'emojis': Counter({c: n for c, n in non_ascii.items() if c in EMOJI_CHARS}),
+        'mentions': Counter(re.findall(MENTION_PATTERN, joined)),
+        'hashtags': Counter(re.findall(HASHTAG_PATTERN, joined)),
+    }
+
+def _legacy_features(texts):
+    """Die ursprüngliche Schleifen-Variante aus dashboard.py, nur noch als Referenz für den Benchmark."""
+    texts = pd.Series(texts).fillna('').astype(str)
+    emojis, mentions, hashtags = [], [], []
+    for text in texts:
+        emojis.extend([c for c in text if c in emoji.EMOJI_DATA])
+        mentions.extend(re.findall(r'@(\w+)', text))
+        hashtags.extend(re.findall(r'#(\w+)', text))
+    caps = texts.apply(lambda x: sum(1 for c in x if c.isupper()) / max(len(x), 1))
+    return emojis, mentions, hashtags, caps
+
+if __name__ == "__main__":
+    # Micro-Benchmark auf den mitgelieferten Daten: python src/features.py
+    texts = pd.concat([
+        pd.read_csv("data/musk_twitter_dataset.csv")['text'],
+        pd.read_csv("data/trump_truths_social.csv")['text'],
+    ], ignore_index=True)
+
+    start = time.perf_counter()
+    emojis, mentions, hashtags, caps = _legacy_features(texts)
+    legacy = time.perf_counter() - start
+
+    upper_pattern()  # einmaliger Aufbau, nicht mitmessen
+    start = time.perf_counter()
+    counts = count_features(texts)
+    vectorized = time.perf_counter() - start
+
+    # Gleiche Ergebnisse wie vorher?
+    assert Counter(emojis) == counts['emojis']
+    assert Counter(mentions) == counts['mentions']
+    assert Counter(hashtags) == counts['hashtags']
+    assert abs(caps.sum() - counts['caps_ratio_sum']) < 1e-6
+
+    print(f"{len(texts)} Posts")
+    print(f"alt (Schleifen):     {legacy:.2f}s")
+    print(f"neu (vektorisiert):  {vectorized:.2f}s  (x{legacy / vectorized:.1f})")
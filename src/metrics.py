@@ -0,0 +1,234 @@
+import os
+import time
+import random
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Laufzeit-Metriken für den Inference-Pfad (Histogramme, Zähler, Gauges) im Prometheus-Textformat.
+# PREDICT_METRICS=0           -> alles aus, stage() liefert dann nur einen leeren Kontextmanager
+# PREDICT_METRICS_PORT=9100   -> /metrics per HTTP bereitstellen (siehe serve()), nur auf 127.0.0.1
+# PREDICT_METRICS_HOST=0.0.0.0 -> Endpunkt auch von außen erreichbar machen (z.B. für Prometheus in einem anderen Container)
+# PREDICT_PROFILE_RATE=0.01   -> 1% der Anfragen mit dem torch-Profiler aufzeichnen (Chrome-Trace in PREDICT_PROFILE_DIR)
+
+ENABLED = os.getenv("PREDICT_METRICS", "1") != "0"
+PROFILE_RATE = float(os.getenv("PREDICT_PROFILE_RATE", "0"))
+PROFILE_DIR = os.getenv("PREDICT_PROFILE_DIR", ".data/traces")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> Histogram
+_counters = {}    # (name, labels) -> float
+_gauges = {}      # name -> (fn, help)
+_help = {}
+_NULL = nullcontext()
+
+class Histogram:
+    """Feste Bucket-Grenzen wie bei Prometheus; gezählt wird nicht-kumulativ, kumuliert wird erst beim Ausgeben."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Grobe Schätzung: obere Grenze des Buckets, in dem das Quantil liegt."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def describe(name, text):
+    _help[name] = text
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram(buckets)
+        hist.observe(value)
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def gauge(name, fn, help=""):
+    """Registriert einen Wert, der erst beim Ausgeben abgefragt wird (z.B. Cache-Trefferquote)."""
+    _gauges[name] = (fn, help)
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("predict_stage_seconds", time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+def stage(name):
+    """Misst die Dauer eines Schritts im Predict-Pfad als Histogramm predict_stage_seconds{stage=name}."""
+    return _StageTimer(name) if ENABLED else _NULL
+
+describe("predict_stage_seconds", "Dauer der einzelnen Schritte im Predict-Pfad")
+
+# ---------- Profiler ----------
+
+@contextmanager
+def _profile():
+    import torch
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    with torch.profiler.profile(activities=activities, record_shapes=True) as prof:
+        yield
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"trace_{time.time():.3f}.json")
+    prof.export_chrome_trace(path)
+    inc("predict_profiles_total")
+
+def maybe_profile():
+    """Zeichnet mit Wahrscheinlichkeit PROFILE_RATE einen torch-Profiler-Trace auf, sonst kein Overhead."""
+    if PROFILE_RATE > 0 and random.random() < PROFILE_RATE:
+        return _profile()
+    return _NULL
+
+# ---------- Ausgabe ----------
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def render():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+    with _lock:
+        histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name in typed:
+            return
+        typed.add(name)
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    for name, (fn, help) in sorted(_gauges.items()):
+        try:
+            value = fn()
+        except Exception:
+            continue
+        if help:
+            lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+def summary():
+    """Kompakte Tabelle für das Dashboard: [Metrik, Labels, Anzahl, Mittel ms, ~p50 ms, ~p95 ms]."""
+    with _lock:
+        items = sorted(_histograms.items())
+        rows = []
+        for (name, labels), h in items:
+            scale = 1000 if name.endswith("_seconds") else 1
+            mean = h.sum / h.count if h.count else 0.0
+            rows.append([name, _labels(labels), h.count, round(mean * scale, 2),
+                         h.quantile(0.5) * scale, h.quantile(0.95) * scale])
+    return rows
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def drain():
+    """Gibt alle bisher gesammelten Histogramme und Zähler zurück und setzt sie zurück (für Worker-Prozesse)."""
+    if not ENABLED:
+        return None
+    with _lock:
+        snapshot = ({k: (h.buckets, h.counts, h.sum, h.count) for k, h in _histograms.items()}, dict(_counters))
+        _histograms.clear()
+        _counters.clear()
+    return snapshot
+
+def merge(snapshot):
+    """Addiert ein Ergebnis von drain() aus einem anderen Prozess zu den eigenen Metriken."""
+    if not ENABLED or not snapshot:
+        return
+    histograms, counters = snapshot
+    with _lock:
+        for key, (buckets, counts, total, count) in histograms.items():
+            hist = _histograms.get(key)
+            if hist is None:
+                hist = _histograms[key] = Histogram(buckets)
+            hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+            hist.sum += total
+            hist.count += count
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port, host="127.0.0.1"):
+    """Startet einen /metrics-Endpunkt für Prometheus in einem Hintergrund-Thread (standardmäßig nur lokal erreichbar)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Metriken unter http://{host}:{port}/metrics")
+    return server
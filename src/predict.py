@@ -1,42 +1,348 @@
 import os
+import json
+import atexit
+import threading
+from collections import OrderedDict
 import torch
 from dotenv import load_dotenv
-from transformers import AutoTokenizer, RobertaForSequenceClassification
+from transformers import AutoConfig, AutoTokenizer, RobertaForSequenceClassification
+from timings import phase, report, STARTUP_TIMINGS
+import metrics
 
 # .env laden
 load_dotenv()
 
 # 1. Setup
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model_id = "dxxrk/BERTweet-tuned-ElonTrumpPrediction"
+# Backend per Umgebungsvariable wählbar:
+#   torch = eager fp32 (Standard), int8 = dynamisch quantisiert (CPU), onnx = onnxruntime (CPU)
+BACKEND = os.getenv("PREDICT_BACKEND", "torch")
+# PREDICT_MODEL kann auch ein lokaler Ordner sein, z.B. ./student_model aus src/distill.py
+model_id = os.getenv("PREDICT_MODEL", "dxxrk/BERTweet-tuned-ElonTrumpPrediction")
+revision = os.getenv("PREDICT_REVISION", "main")
 hf_token = os.getenv("HUGGINGFACE_API")
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ONNX_PATH = os.getenv("PREDICT_ONNX_PATH", os.path.join(script_dir, "..", "onnx_model", "model.onnx"))
+MAX_LENGTH = 128
 
-# 2. Modell & Tokenizer laden
-tokenizer = AutoTokenizer.from_pretrained("vinai/bertweet-base", normalization=True)
-model = RobertaForSequenceClassification.from_pretrained(model_id, token=hf_token).to(device)
+# Vorhersage-Cache: PREDICT_CACHE_SIZE=0 schaltet ihn ab, PREDICT_CACHE_FILE speichert ihn auf der Festplatte
+CACHE_MAX_ENTRIES = int(os.getenv("PREDICT_CACHE_SIZE", "10000"))
+CACHE_MAX_BYTES = int(float(os.getenv("PREDICT_CACHE_MB", "16")) * 1024 * 1024)
+CACHE_FILE = os.getenv("PREDICT_CACHE_FILE")
 
-def predict(text):
-    """Gibt Wahrscheinlichkeiten als Dictionary zurück: {"Donald Trump": float, "Elon Musk": float}"""
-    if not text.strip():
-        return {"Error": 1.0}
+# Kaskade: PREDICT_CASCADE=1 beantwortet sichere Texte mit dem n-Gramm-Modell aus src/cascade.py
+CASCADE = os.getenv("PREDICT_CASCADE", "0") == "1"
+
+def load_model(backend=BACKEND):
+    """
+    Lädt das Modell für das gewählte Backend und gibt (run, device) zurück.
+    `run(inputs)` nimmt das gepaddete BatchEncoding (auf der CPU), verschiebt es selbst
+    auf das passende Gerät und liefert die Logits als Tensor.
+    """
+    if backend == "onnx":
+        # onnxruntime ist optional (requirements-onnx.txt), Export über src/export_model.py
+        import onnxruntime as ort
+        session = ort.InferenceSession(ONNX_PATH, providers=["CPUExecutionProvider"])
+
+        def run(inputs):
+            feeds = {name: inputs[name].numpy() for name in ("input_ids", "attention_mask")}
+            with metrics.stage("forward"):
+                return torch.from_numpy(session.run(["logits"], feeds)[0])
+        return run, "cpu"
+
+    global torch_model
+    m, target = load_torch_model(backend)
+    if backend == "torch":
+        torch_model = m
+    return torch_runner(m, target)
+
+def load_torch_model(backend=BACKEND, target=None):
+    """Lädt das PyTorch-Modell (torch oder int8) und gibt (model, device) zurück."""
+    if backend not in ("torch", "int8"):
+        raise ValueError(f"Unbekanntes Backend: {backend} (erlaubt: torch, int8, onnx)")
+
+    m = RobertaForSequenceClassification.from_pretrained(model_id, revision=revision, token=hf_token)
+    m.eval()
+    if backend == "int8":
+        # Dynamische Quantisierung der Linear-Layer läuft nur auf der CPU
+        m = torch.quantization.quantize_dynamic(m, {torch.nn.Linear}, dtype=torch.qint8)
+        target = "cpu"
+    else:
+        target = target or ("cuda" if torch.cuda.is_available() else "cpu")
+    m.to(target)
+    return m, target
+
+def torch_runner(m, target):
+    """Baut die run()-Funktion für ein geladenes PyTorch-Modell (auch in den Replikat-Prozessen, siehe replica_pool.py)."""
+    def run(inputs):
+        with metrics.stage("transfer"):
+            inputs = inputs.to(target)
+        with metrics.stage("forward"), torch.no_grad():
+            logits = m(**inputs).logits
+            if metrics.ENABLED and target == "cuda":
+                # Sonst landet die asynchrone GPU-Zeit im nächsten Schritt
+                torch.cuda.synchronize()
+        return logits
+    return run, target
+
+def model_fingerprint(backend=BACKEND):
+    """Eindeutige Kennung des geladenen Modells (Commit-Hash + Backend); ändert sich das Modell, wird der Cache ungültig."""
+    config = AutoConfig.from_pretrained(model_id, revision=revision, token=hf_token)
+    fingerprint = f"{model_id}@{getattr(config, '_commit_hash', None) or revision}/{backend}"
+    if os.path.isdir(model_id):
+        # Lokales Modell hat keinen Commit-Hash -> Zeitstempel der Gewichte
+        fingerprint += f"/{max(os.path.getmtime(os.path.join(model_id, f)) for f in os.listdir(model_id)):.0f}"
+    if backend == "onnx":
+        fingerprint += f"/{os.path.getmtime(ONNX_PATH):.0f}"
+    return fingerprint
+
+class PredictionCache:
+    """
+    LRU-Cache für Vorhersagen, Schlüssel ist der Text genau so, wie Kaskade und Modell ihn bewerten.
+    Begrenzt nach Anzahl Einträgen und geschätzter Größe in Bytes; zählt Treffer und Fehlschläge.
+    Mit `path` wird der Cache beim Start geladen und beim Beenden gespeichert – aber nur,
+    wenn `namespace` (Modell-Fingerprint) übereinstimmt.
+    """
+    ENTRY_OVERHEAD = 160  # grobe Schätzung für Dict, Floats und OrderedDict-Knoten pro Eintrag
+
+    def __init__(self, namespace, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, path=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def _size(self, key):
+        return len(key.encode("utf-8")) + self.ENTRY_OVERHEAD
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key, result):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = dict(result)
+            self._bytes += self._size(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._size(old_key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("namespace") != self.namespace:
+            print(f"Cache {self.path} gehört zu einem anderen Modell, wird verworfen.")
+            return
+        for key, result in data["entries"]:
+            self.put(key, result)
+
+    def save(self):
+        with self._lock:
+            data = {"namespace": self.namespace, "entries": list(self._entries.items())}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
 
-    inputs = tokenizer(
-        text,
-        return_tensors="pt",
-        truncation=True,
-        padding="max_length",
-        max_length=128
-    ).to(device)
+# 2. Modell & Tokenizer laden (lazy: erst beim ersten Aufruf oder über warmup() im Hintergrund)
+tokenizer = None
+run_model = None
+torch_model = None  # geladenes fp32-Modell (auch für den Encoder in embeddings.py), sonst None
+device = None
+cache = None
+cascade_model = None
+_frontend_ready = False
+_load_lock = threading.Lock()
 
-    with torch.no_grad():
-        logits = model(**inputs).logits
+def load_tokenizer():
+    global tokenizer
+    with _load_lock:
+        if tokenizer is None:
+            with phase("tokenizer"):
+                tokenizer = AutoTokenizer.from_pretrained("vinai/bertweet-base", normalization=True)
+    return tokenizer
 
-    probs = torch.softmax(logits, dim=1)[0]
+def load_frontend():
+    """Lädt Tokenizer, Kaskade und Cache ohne das Modell (reicht, wenn Replikate rechnen, siehe replica_pool.py)."""
+    global cache, cascade_model, _frontend_ready
+    load_tokenizer()
+    with _load_lock:
+        if not _frontend_ready:
+            if CASCADE:
+                from cascade import Cascade
+                with phase("cascade"):
+                    cascade_model = Cascade()
+            with phase("cache"):
+                namespace = model_fingerprint()
+                if cascade_model is not None:
+                    # Antworten der ersten Stufe landen auch im Cache -> neu trainierte Kaskade macht ihn ungültig
+                    namespace += f"/cascade-{cascade_model.threshold:.4f}/{os.path.getmtime(cascade_model.path):.0f}"
+                cache = PredictionCache(namespace, path=CACHE_FILE) if CACHE_MAX_ENTRIES > 0 else None
+            _frontend_ready = True
 
-    return {
-        "Donald Trump": probs[0].item(),
-        "Elon Musk": probs[1].item()
-    }
+def load():
+    """Lädt Tokenizer, Modell und Cache genau einmal (thread-sicher). Wird von predict_batch() automatisch aufgerufen."""
+    global run_model, device
+    load_frontend()
+    with _load_lock:
+        if run_model is None:
+            with phase("model"):
+                run, dev = load_model()
+            device = dev
+            run_model = run
+
+# Werte, die erst beim Abruf der Metriken gelesen werden
+metrics.gauge("predict_model_load_seconds", lambda: STARTUP_TIMINGS["model"], "Ladezeit des Modells")
+metrics.gauge("predict_cache_hits", lambda: cache.stats()["hits"], "Treffer im Vorhersage-Cache")
+metrics.gauge("predict_cache_misses", lambda: cache.stats()["misses"], "Fehlschläge im Vorhersage-Cache")
+metrics.gauge("predict_cache_hit_rate", lambda: cache.stats()["hit_rate"], "Trefferquote des Vorhersage-Caches")
+
+def warmup(model=True):
+    """Startet das Laden des Modells (oder mit model=False nur von Tokenizer, Kaskade und Cache) in einem Hintergrund-Thread."""
+    thread = threading.Thread(target=load if model else load_frontend, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def _forward(encoded, run=None):
+    """Ein Forward-Pass für eine Liste bereits tokenisierter Texte, gepaddet nur auf den längsten Eintrag."""
+    with metrics.stage("pad"):
+        inputs = tokenizer.pad(encoded, padding="longest", return_tensors="pt")
+    logits = (run or run_model)(inputs)
+    with metrics.stage("postprocess"):
+        return torch.softmax(logits.float(), dim=1).tolist()
+
+def predict_batch(texts, batch_size=32, sort_by_length=True, run=None, score=None):
+    """
+    Gibt für jeden Text ein Dictionary {"Donald Trump": float, "Elon Musk": float} zurück,
+    in der Reihenfolge der Eingabe. Leere Texte ergeben {"Error": 1.0}.
+
+    Die Texte werden einmal ohne Padding tokenisiert, optional nach Token-Länge sortiert
+    und in Batches von `batch_size` ausgewertet; jeder Batch wird nur auf seinen
+    längsten Eintrag gepaddet (statt immer auf 128 Tokens). Doppelte Texte werden nur einmal gerechnet.
+    Mit `run` kann ein anderes Backend aus load_model() übergeben werden (dann ohne Cache).
+    Mit `score(texts, batch_size)` rechnet statt des lokalen Modells z.B. ein ReplicaPool;
+    Cache und Kaskade laufen dann weiterhin hier, nur die übrigen Texte gehen an `score`.
+    """
+    metrics.inc("predict_texts_total", len(texts))
+    results = [{"Error": 1.0}] * len(texts)
+    positions = {}  # Text -> alle Positionen in der Eingabe
+    for i, text in enumerate(texts):
+        text = str(text)
+        if text.strip():
+            positions.setdefault(text, []).append(i)
+    if run is not None:
+        load_tokenizer()
+    elif score is not None:
+        load_frontend()
+    else:
+        load()
+
+    unique = list(positions)
+    for text, result in zip(unique, _predict_unique(unique, batch_size, sort_by_length, run, score)):
+        for i in positions[text]:
+            results[i] = dict(result)
+    return results
+
+def _predict_unique(texts, batch_size, sort_by_length, run, score):
+    """predict_batch() für verschiedene, nicht-leere Texte; Cache-Schlüssel ist genau der Text, den Kaskade und Modell sehen."""
+    results = [None] * len(texts)
+    valid = list(range(len(texts)))
+
+    # Bereits bekannte Texte aus dem Cache holen
+    use_cache = cache is not None and run is None
+    if use_cache:
+        pending = []
+        with metrics.stage("cache_lookup"):
+            for i in valid:
+                hit = cache.get(texts[i])
+                if hit is None:
+                    pending.append(i)
+                else:
+                    results[i] = hit
+        valid = pending
+
+    # Erste Stufe der Kaskade: sichere Texte direkt beantworten, nur der Rest geht an BERTweet
+    if cascade_model is not None and run is None and valid:
+        with metrics.stage("cascade"):
+            probs = cascade_model.probs([texts[i] for i in valid])
+            confident = cascade_model.confident(probs).tolist()
+        pending = []
+        for i, p, ok in zip(valid, probs.tolist(), confident):
+            if not ok:
+                pending.append(i)
+                continue
+            results[i] = {"Donald Trump": p[0], "Elon Musk": p[1]}
+            if use_cache:
+                cache.put(texts[i], results[i])
+        metrics.inc("predict_cascade_answered_total", len(valid) - len(pending))
+        metrics.inc("predict_cascade_escalated_total", len(pending))
+        valid = pending
+    if not valid:
+        return results
+
+    if score is not None:
+        for i, result in zip(valid, score([texts[i] for i in valid], batch_size)):
+            results[i] = result
+            if use_cache:
+                cache.put(texts[i], result)
+        return results
+
+    # Einmal tokenisieren, ohne Padding
+    with metrics.stage("tokenize"):
+        encoded = tokenizer([texts[i] for i in valid], truncation=True, max_length=MAX_LENGTH)["input_ids"]
+    order = list(range(len(valid)))
+    if sort_by_length:
+        order.sort(key=lambda j: len(encoded[j]))
+
+    for start in range(0, len(order), batch_size):
+        chunk = order[start:start + batch_size]
+        metrics.observe("predict_batch_size", len(chunk), metrics.SIZE_BUCKETS)
+        with metrics.maybe_profile():
+            probs = _forward([{"input_ids": encoded[j]} for j in chunk], run)
+        for j, p in zip(chunk, probs):
+            results[valid[j]] = {
+                "Donald Trump": p[0],
+                "Elon Musk": p[1]
+            }
+            if use_cache:
+                cache.put(texts[valid[j]], results[valid[j]])
+
+    return results
+
+def predict(text):
+    """Gibt Wahrscheinlichkeiten als Dictionary zurück: {"Donald Trump": float, "Elon Musk": float}"""
+    return predict_batch([text])[0]
 
 if __name__ == "__main__":
-    print(predict("1 big thing: Stunning crime crash: axios.com/newsletters/axios-am"))
\ No newline at end of file
+    print(predict("1 big thing: Stunning crime crash: axios.com/newsletters/axios-am"))
+    print(report())
\ No newline at end of file
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import torch
+import torch.multiprocessing as mp
+import predict
+import metrics
+
+# Mehrere Modell-Replikate in eigenen Prozessen für Mehrkern-CPUs:
+# - das Modell wird einmal im Hauptprozess geladen und mit share_memory() in Shared Memory gelegt;
+#   die Worker bekommen nur Verweise darauf, der RAM wächst also nicht mit der Anzahl Replikate
+# - jeder Worker nutzt cpu_count // workers Threads (statt dass alle um dieselben Kerne konkurrieren)
+# - Anfragen gehen an den Worker mit den wenigsten offenen Anfragen
+# - Cache und Kaskade laufen im Hauptprozess (predict_batch(..., score=...)), nur der Rest geht an die Worker;
+#   deren Stage-Metriken kommen mit jedem Ergebnis zurück und landen im Ops-Tab
+# - stirbt ein Worker, schlagen seine offenen Anfragen mit RuntimeError fehl, neue gehen an die übrigen
+# Nur für das torch-Backend auf der CPU. Im Dashboard: PREDICT_REPLICAS=4 make dashboard
+# Benchmark: python src/replica_pool.py --bench [--max-workers 8]
+
+BENCH_FILE = ".data/bench/replicas.json"
+RESULT_TIMEOUT = 60    # Sekunden, die predict_batch() höchstens auf ein Replikat wartet
+STARTUP_TIMEOUT = 300  # Sekunden bis alle Worker bereit sind
+
+def _worker_metrics():
+    """Metriken des Workers seit dem letzten Ergebnis; die Textzahl zählt der Hauptprozess schon selbst."""
+    snapshot = metrics.drain()
+    if snapshot:
+        snapshot[1].pop(("predict_texts_total", ()), None)
+    return snapshot
+
+def _worker(index, model, threads, requests, results):
+    torch.set_num_threads(threads)
+    predict.load_tokenizer()
+    run, _ = predict.torch_runner(model, "cpu")
+    results.put((None, index, None, None))  # bereit
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        request_id, texts, batch_size = item
+        try:
+            result = predict.predict_batch(texts, batch_size=batch_size, run=run)
+        except Exception as e:
+            result = RuntimeError(f"Replikat {index}: {e!r}")
+        results.put((request_id, index, result, _worker_metrics()))
+
+class ReplicaPool:
+    """
+    `workers` Prozesse mit gemeinsamem Modell. predict_batch() hat dieselbe Signatur wie predict.predict_batch()
+    und kann z.B. als predict_fn an den MicroBatcher übergeben werden; Cache und Kaskade laufen dabei im
+    aufrufenden Prozess. score() schickt Texte ohne Cache und Kaskade direkt an ein Replikat.
+    """
+    def __init__(self, workers=2, threads=None, model=None, timeout=RESULT_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        if model is None:
+            model, _ = predict.load_torch_model("torch", target="cpu")
+            # Hauptprozess hält das Modell ohnehin (z.B. für den Encoder in embeddings.py)
+            predict.torch_model = model
+        model.share_memory()
+
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._requests = [ctx.Queue() for _ in range(workers)]
+        self._processes = [
+            ctx.Process(target=_worker, args=(i, model, self.threads, self._requests[i], self._results), daemon=True)
+            for i in range(workers)
+        ]
+        for process in self._processes:
+            process.start()
+        for _ in range(workers):
+            try:
+                self._results.get(timeout=STARTUP_TIMEOUT)  # warten, bis alle Worker bereit sind
+            except queue.Empty:
+                self.close()
+                raise RuntimeError(f"Replikate nach {STARTUP_TIMEOUT}s nicht bereit")
+
+        self._load = [0] * workers
+        self._pending = {}  # request_id -> (Future, Worker)
+        self._dead = set()
+        self._closed = False
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = threading.Thread(target=self._collect, name="replica-results", daemon=True)
+        self._collector.start()
+
+    def submit(self, texts, batch_size=32):
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            # Am wenigsten ausgelastetes lebendes Replikat (bei Gleichstand das mit dem kleinsten Index)
+            alive = [w for w in range(self.workers) if w not in self._dead]
+            if not alive:
+                raise RuntimeError("Alle Replikate sind beendet")
+            worker = min(alive, key=self._load.__getitem__)
+            self._load[worker] += 1
+            self._pending[request_id] = (future, worker)
+        self._requests[worker].put((request_id, list(texts), batch_size))
+        return future
+
+    def score(self, texts, batch_size=32):
+        return self.submit(texts, batch_size).result(timeout=self.timeout)
+
+    def predict_batch(self, texts, batch_size=32):
+        return predict.predict_batch(texts, batch_size=batch_size, score=self.score)
+
+    def load(self):
+        with self._lock:
+            return list(self._load)
+
+    def _collect(self):
+        while True:
+            try:
+                request_id, worker, result, worker_metrics = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if request_id is None:
+                return
+            metrics.merge(worker_metrics)
+            with self._lock:
+                future, _ = self._pending.pop(request_id, (None, None))
+                if future is not None:
+                    self._load[worker] -= 1
+            if future is None:
+                continue  # Worker wurde schon als beendet behandelt
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            self._check_workers()
+
+    def _check_workers(self):
+        """Offene Anfragen abgestürzter Worker mit einem Fehler beenden, statt sie ewig warten zu lassen."""
+        if self._closed:
+            return
+        for worker, process in enumerate(self._processes):
+            if worker in self._dead or process.is_alive():
+                continue
+            with self._lock:
+                self._dead.add(worker)
+                lost = [rid for rid, (_, w) in self._pending.items() if w == worker]
+                futures = [self._pending.pop(rid)[0] for rid in lost]
+                self._load[worker] = 0
+            metrics.inc("replica_deaths_total")
+            print(f"Replikat {worker} beendet (Exit-Code {process.exitcode}), {len(futures)} offene Anfragen schlagen fehl")
+            for future in futures:
+                future.set_exception(RuntimeError(f"Replikat {worker} ist beendet (Exit-Code {process.exitcode})"))
+
+    def close(self):
+        self._closed = True
+        for q in self._requests:
+            q.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+        self._results.put((None, None, None, None))
+        if hasattr(self, "_collector"):
+            self._collector.join(timeout=5)
+
+# ---------- Benchmark ----------
+
+def bench(max_workers=None, n_texts=512, request_size=8):
+    """Durchsatz (Texte/s) bei 1, 2, 4, ... Replikaten; Anfragen kommen parallel aus einem Thread-Pool."""
+    from benchmark import load_texts
+    texts = load_texts(n_texts)
+    requests = [texts[i:i + request_size] for i in range(0, len(texts), request_size)]
+    max_workers = max_workers or os.cpu_count() or 1
+    model, _ = predict.load_torch_model("torch", target="cpu")
+
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    results = []
+    for workers in counts:
+        pool = ReplicaPool(workers, model=model)
+        pool.score(requests[0])  # Aufwärmen
+        with ThreadPoolExecutor(max_workers=workers * 2) as clients:
+            start = time.perf_counter()
+            # score() statt predict_batch(): sonst wären ab dem zweiten Durchlauf alles Cache-Treffer
+            list(clients.map(pool.score, requests))
+            elapsed = time.perf_counter() - start
+        pool.close()
+        per_s = len(texts) / elapsed
+        results.append({"workers": workers, "threads": pool.threads, "texts_per_s": per_s,
+                        "speedup": per_s / results[0]["texts_per_s"] if results else 1.0})
+        print(f"{workers:>3} Worker x {pool.threads:>2} Threads: {per_s:8.1f} Texte/s (x{results[-1]['speedup']:.2f})")
+
+    os.makedirs(os.path.dirname(BENCH_FILE), exist_ok=True)
+    with open(BENCH_FILE, "w", encoding="utf-8") as f:
+        json.dump({"texts": len(texts), "request_size": request_size, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+    print(f"Gespeichert: {BENCH_FILE}")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        max_workers = int(sys.argv[sys.argv.index("--max-workers") + 1]) if "--max-workers" in sys.argv else None
+        bench(max_workers)
+    else:
+        pool = ReplicaPool(int(os.getenv("PREDICT_REPLICAS", "2")))
+        print(pool.predict_batch(["1 big thing: Stunning crime crash: axios.com/newsletters/axios-am"]))
+        pool.close()
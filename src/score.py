@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Offline-Scoring großer Textdateien (CSV / JSONL / Parquet) mit dem Modell aus predict.py.
+# - Eingabe wird in Chunks gestreamt, mehrere Worker-Prozesse bewerten parallel
+#   (predict_batch sortiert jeden Chunk nach Länge und padded pro Batch nur auf den längsten Text)
+# - Ausgabe wird chunkweise in Eingabe-Reihenfolge angehängt: row,prob_trump,prob_musk
+# - Abbruch? Einfach nochmal starten: bereits geschriebene Zeilen werden übersprungen
+# Aufruf: python src/score.py eingabe.csv ausgabe.csv [--column text] [--workers 4]
+
+OUTPUT_HEADER = "row,prob_trump,prob_musk\n"
+
+def read_chunks(path, column, chunksize):
+    """Streamt die Textspalte einer CSV-, JSONL- oder Parquet-Datei als Listen von Strings."""
+    if path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=[column]):
+            yield batch.column(column).to_pylist()
+    elif path.endswith((".jsonl", ".json")):
+        for chunk in pd.read_json(path, lines=True, chunksize=chunksize, dtype=False):
+            yield chunk[column].tolist()
+    else:
+        for chunk in pd.read_csv(path, usecols=[column], chunksize=chunksize, on_bad_lines='skip', dtype=str):
+            yield chunk[column].tolist()
+
+def skip_rows(chunks, n):
+    """Überspringt die ersten n Zeilen (Resume), ohne sie zu bewerten."""
+    for texts in chunks:
+        if n >= len(texts):
+            n -= len(texts)
+            continue
+        yield texts[n:]
+        n = 0
+
+def _last_newline(f, end, block=1 << 16):
+    """Position des letzten Zeilenumbruchs vor `end`, rückwärts blockweise gesucht; -1, wenn es keinen gibt."""
+    while end > 0:
+        start = max(0, end - block)
+        f.seek(start)
+        i = f.read(end - start).rfind(b"\n")
+        if i >= 0:
+            return start + i
+        end = start
+    return -1
+
+def rows_done(path):
+    """
+    Anzahl bereits geschriebener Zeilen. Eine halb geschriebene letzte Zeile (Absturz mitten im Schreiben)
+    wird abgeschnitten, damit das Anhängen sauber weitergeht. Gelesen wird nur das Dateiende, nicht die ganze Ausgabe.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb+") as f:
+        last = _last_newline(f, f.seek(0, os.SEEK_END))
+        if last < 0:
+            return None  # nicht einmal der Header ist vollständig -> neu beginnen
+        f.truncate(last + 1)
+        previous = _last_newline(f, last)
+        if previous < 0:
+            return 0  # nur der Header
+        f.seek(previous + 1)
+        line = f.read(last - previous - 1)
+    return int(line.split(b",", 1)[0]) + 1
+
+# ---------- Worker ----------
+
+def _init_worker(threads):
+    import torch
+    import predict
+    torch.set_num_threads(threads)
+    predict.load()
+
+def _score_chunk(start, texts, batch_size):
+    import predict
+    # run=... umgeht den Vorhersage-Cache (lohnt sich bei einmaligem Durchlauf nicht)
+    results = predict.predict_batch([t if isinstance(t, str) else "" for t in texts], batch_size=batch_size, run=predict.run_model)
+    lines = []
+    for i, r in enumerate(results, start):
+        if "Error" in r:
+            lines.append(f"{i},,\n")
+        else:
+            lines.append(f"{i},{r['Donald Trump']:.6f},{r['Elon Musk']:.6f}\n")
+    return "".join(lines)
+
+def score_file(input_path, output_path, column="text", workers=None, chunksize=2048, batch_size=32, overwrite=False):
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    done = None if overwrite else rows_done(output_path)
+    if done is None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(OUTPUT_HEADER)
+        done = 0
+    elif done:
+        print(f"Setze nach {done:,} bereits bewerteten Zeilen fort...")
+
+    chunks = skip_rows(read_chunks(input_path, column, chunksize), done)
+    row, scored, start_time = done, 0, time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        in_flight = deque()
+        exhausted = False
+        while in_flight or not exhausted:
+            # Höchstens 2 Chunks pro Worker unterwegs -> konstanter Speicher
+            while not exhausted and len(in_flight) < 2 * workers:
+                texts = next(chunks, None)
+                if texts is None:
+                    exhausted = True
+                    break
+                in_flight.append((len(texts), pool.submit(_score_chunk, row, texts, batch_size)))
+                row += len(texts)
+            if not in_flight:
+                break
+
+            count, future = in_flight.popleft()
+            out.write(future.result())
+            out.flush()
+            scored += count
+            elapsed = time.perf_counter() - start_time
+            print(f"  {done + scored:,} Zeilen | {scored / elapsed:,.0f} Zeilen/s", end="\r")
+
+    print(f"\nFertig: {done + scored:,} Zeilen in {output_path} ({workers} Worker x {threads} Threads)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bewertet große Textdateien mit dem Trump-vs-Musk-Modell")
+    parser.add_argument("input", help="CSV, JSONL oder Parquet")
+    parser.add_argument("output", help="Ausgabe-CSV (row,prob_trump,prob_musk)")
+    parser.add_argument("--column", default="text", help="Name der Textspalte")
+    parser.add_argument("--workers", type=int, help="Anzahl Worker-Prozesse (Standard: halbe Kernzahl)")
+    parser.add_argument("--chunksize", type=int, default=2048, help="Zeilen pro Aufgabe")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--overwrite", action="store_true", help="Nicht fortsetzen, sondern neu beginnen")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        sys.exit(f"Datei nicht gefunden: {args.input}")
+    score_file(args.input, args.output, args.column, args.workers, args.chunksize, args.batch_size, args.overwrite)
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import hashlib
+from collections import Counter, defaultdict
+import numpy as np
+import pandas as pd
+from corpus import read_corpus
+
+# Invertierter Index über den Korpus für den Such-Tab im Dashboard.
+# Terme: Wörter (klein geschrieben), Hashtags ("#maga") und Mentions ("@elonmusk") als eigene Terme.
+# Pro Term: sortierte Post-IDs + Häufigkeit im Post (Postings), daraus Zählungen pro Autor und Treffer-Posts.
+# Gespeichert unter .data/search/; bei neuen Zeilen im Korpus werden nur diese indexiert,
+# ändern sich bereits indexierte Zeilen, wird alles neu gebaut.
+# Aufruf: python src/search_index.py [suchbegriffe]
+
+INDEX_DIR = ".data/search"
+META_FILE = os.path.join(INDEX_DIR, "meta.json")
+DOCS_FILE = os.path.join(INDEX_DIR, "docs.parquet")
+POSTINGS_FILE = os.path.join(INDEX_DIR, "postings.npz")
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"[#@]?\w+")
+STOPWORDS = set("""
+a an and are as at be but by for from has have he i if in is it its me my not of on or our so that the
+their them they this to was we were will with you your just all do rt amp https http co
+""".split())
+
+def tokenize(text):
+    return [t.lower() for t in TOKEN_PATTERN.findall(text)]
+
+def _digest(texts):
+    h = hashlib.sha1()
+    for text in texts:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class SearchIndex:
+    def __init__(self):
+        self.sources = []                        # Code -> Quellname (z.B. "trump_truths_social")
+        self.state = {}                          # Quellname -> {"rows": n, "digest": sha1 der indexierten Texte}
+        self.doc_source = np.zeros(0, dtype=np.int16)
+        self.texts = []
+        self.postings = {}                       # Term -> (docs int32, tf uint16)
+
+    def __len__(self):
+        return len(self.texts)
+
+    # ---------- Aufbau ----------
+
+    def add(self, source, texts):
+        if source not in self.sources:
+            self.sources.append(source)
+        code = self.sources.index(source)
+        base = len(self.texts)
+
+        new = defaultdict(lambda: ([], []))
+        for i, text in enumerate(texts, base):
+            for term, count in Counter(tokenize(text)).items():
+                docs, tfs = new[term]
+                docs.append(i)
+                tfs.append(count)
+
+        for term, (docs, tfs) in new.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tfs = np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16)
+            if term in self.postings:
+                old_docs, old_tfs = self.postings[term]
+                docs, tfs = np.concatenate([old_docs, docs]), np.concatenate([old_tfs, tfs])
+            self.postings[term] = (docs, tfs)
+
+        self.texts.extend(texts)
+        self.doc_source = np.concatenate([self.doc_source, np.full(len(texts), code, dtype=np.int16)])
+
+    def update(self):
+        """Bringt den Index auf den Stand des Korpus; gibt die Anzahl neu indexierter Posts zurück."""
+        corpus = read_corpus(columns=["source", "text"])
+        added = 0
+        groups = {str(s): g["text"].astype(str).tolist() for s, g in corpus.groupby("source", sort=True, observed=True)}
+
+        # Bereits indexierte Zeilen verändert (z.B. CSV neu geschrieben)? -> komplett neu bauen
+        for source, state in self.state.items():
+            texts = groups.get(source, [])
+            if len(texts) < state["rows"] or _digest(texts[:state["rows"]]) != state["digest"]:
+                print(f"Suchindex: {source} hat sich verändert, baue neu auf...")
+                self.__init__()
+                break
+
+        for source, texts in groups.items():
+            done = self.state.get(source, {"rows": 0})["rows"]
+            if len(texts) > done:
+                self.add(source, texts[done:])
+                added += len(texts) - done
+            self.state[source] = {"rows": len(texts), "digest": _digest(texts)}
+        return added
+
+    # ---------- Speichern / Laden ----------
+
+    def save(self):
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self.postings[t][0]) for t in terms], out=offsets[1:])
+        docs = np.concatenate([self.postings[t][0] for t in terms]) if terms else np.zeros(0, np.int32)
+        tfs = np.concatenate([self.postings[t][1] for t in terms]) if terms else np.zeros(0, np.uint16)
+
+        np.savez(POSTINGS_FILE + ".tmp.npz", terms=np.array(terms, dtype=str), offsets=offsets, docs=docs, tfs=tfs)
+        os.replace(POSTINGS_FILE + ".tmp.npz", POSTINGS_FILE)
+        pd.DataFrame({"source": self.doc_source, "text": self.texts}).to_parquet(DOCS_FILE, index=False)
+        with open(META_FILE + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "sources": self.sources, "state": self.state}, f)
+        os.replace(META_FILE + ".tmp", META_FILE)
+
+    @classmethod
+    def load(cls):
+        index = cls()
+        if not os.path.exists(META_FILE):
+            return index
+        with open(META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            return index
+        data = np.load(POSTINGS_FILE)
+        offsets, docs, tfs = data["offsets"], data["docs"], data["tfs"]
+        index.postings = {term: (docs[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+                          for i, term in enumerate(data["terms"].tolist())}
+        table = pd.read_parquet(DOCS_FILE)
+        index.doc_source = table["source"].to_numpy(dtype=np.int16)
+        index.texts = table["text"].tolist()
+        index.sources = meta["sources"]
+        index.state = meta["state"]
+        return index
+
+    # ---------- Abfragen ----------
+
+    def _per_source(self, values, docs):
+        return {source: int(values[self.doc_source[docs] == code].sum()) for code, source in enumerate(self.sources)}
+
+    def term_counts(self, term):
+        """Für einen Term: Anzahl Posts und Vorkommen insgesamt, jeweils pro Quelle."""
+        docs, tfs = self.postings.get(term, (np.zeros(0, np.int32), np.zeros(0, np.uint16)))
+        return {
+            "posts": self._per_source(np.ones(len(docs), dtype=np.int64), docs),
+            "occurrences": self._per_source(tfs.astype(np.int64), docs),
+        }
+
+    def match(self, terms, source=None):
+        """Post-IDs, die alle Terme enthalten (UND), optional nur aus einer Quelle."""
+        if not terms or (source is not None and source not in self.sources):
+            return np.zeros(0, dtype=np.int32)
+        postings = sorted((self.postings.get(t, (np.zeros(0, np.int32), None))[0] for t in terms), key=len)
+        docs = postings[0]
+        for other in postings[1:]:
+            docs = np.intersect1d(docs, other, assume_unique=True)
+        if source is not None:
+            docs = docs[self.doc_source[docs] == self.sources.index(source)]
+        return docs
+
+    def cooccurring(self, docs, exclude=(), n=15, sample=5000):
+        """Häufigste andere Terme in den Treffer-Posts (ohne Stoppwörter)."""
+        counter = Counter()
+        for i in docs[-sample:]:
+            counter.update(set(tokenize(self.texts[i])))
+        for term in set(exclude) | STOPWORDS:
+            counter.pop(term, None)
+        return counter.most_common(n)
+
+    def search(self, query, source=None, limit=20):
+        terms = tokenize(query)
+        docs = self.match(terms, source)
+        return {
+            "terms": {t: self.term_counts(t) for t in terms},
+            "matches": self._per_source(np.ones(len(docs), dtype=np.int64), docs),
+            "cooccurring": self.cooccurring(docs, exclude=terms),
+            # Neueste zuerst: spätere Zeilen stehen im Korpus weiter hinten
+            "posts": [(self.sources[self.doc_source[i]], self.texts[i]) for i in docs[::-1][:limit]],
+        }
+
+def load_index():
+    """Lädt den gespeicherten Index, indexiert neue Korpus-Zeilen und speichert nur bei Änderungen."""
+    index = SearchIndex.load()
+    added = index.update()
+    if added:
+        index.save()
+        print(f"Suchindex: {added} Posts indexiert ({len(index)} gesamt, {len(index.postings)} Terme)")
+    return index
+
+if __name__ == "__main__":
+    import sys
+    import time
+    index = load_index()
+    if len(sys.argv) > 1:
+        start = time.perf_counter()
+        result = index.search(" ".join(sys.argv[1:]))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(json.dumps({k: v for k, v in result.items() if k != "posts"}, indent=2, ensure_ascii=False))
+        for source, text in result["posts"][:5]:
+            print(f"[{source}] {text}")
+        print(f"{elapsed:.1f} ms")
@@ -0,0 +1,28 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Startzeit-Messung: jede Phase (Tokenizer, Modell, Daten, Analyse, UI ...) wird einmal erfasst
+PROCESS_START = time.perf_counter()
+STARTUP_TIMINGS = {}
+_lock = threading.Lock()
+
+@contextmanager
+def phase(name):
+    """Misst die Dauer eines Startschritts und legt sie unter `name` in STARTUP_TIMINGS ab."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            STARTUP_TIMINGS[name] = time.perf_counter() - start
+
+def report():
+    """Gibt die gemessenen Phasen als Tabelle zurück (Dauer und Zeitpunkt seit Prozessstart)."""
+    with _lock:
+        timings = dict(STARTUP_TIMINGS)
+    lines = ["Startup-Zeiten:"]
+    for name, seconds in timings.items():
+        lines.append(f"  {name:<12} {seconds:7.2f}s")
+    lines.append(f"  {'gesamt':<12} {time.perf_counter() - PROCESS_START:7.2f}s seit Prozessstart")
+    return "\n".join(lines)
\ No newline at end of file
@@ -3,44 +3,357 @@
 #0 = TRUMP
 #1 = ELON
 import os
+import sys
+import json
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import torch
-import pandas as pd
+import transformers
 from transformers import AutoTokenizer
 from safetensors.torch import save_file
 from dotenv import load_dotenv
+from corpus import read_corpus, iter_corpus
 
 # Setup
 #token für schnelleren Download: kann man hier erstellen https://huggingface.co/settings/tokens
 load_dotenv()
 hf_token = os.getenv("HUGGINGFACE_API")
-if not hf_token:
-    print("Warnung: Kein HUGGINGFACE_API Token in .env gefunden!")
 
+OUTPUT_FILE = ".data/processed_data.safetensors"
+KEYS_FILE = ".data/processed_keys.npy"   # SHA-1 der Texte in Trainingsreihenfolge (für Transformer.py --incremental)
+SHARD_DIR = ".data/shards"
+MAX_LENGTH = 128
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-SOURCE_DIR = os.path.join(script_dir, "..", "data")
-os.makedirs(".data", exist_ok=True)
-tokenizer = AutoTokenizer.from_pretrained("vinai/bertweet-base", normalization=True, token=hf_token)
+# Streaming-Modus
+CHUNK_ROWS = 2000       # Zeilen pro Korpus-Batch bzw. pro Aufgabe im Prozess-Pool
+SHARD_ROWS = 50000      # Zeilen pro Ausgabe-Shard
 
-# 1. Alle CSVs laden & verbinden
-df = pd.concat([
-    pd.read_csv(
-        os.path.join(SOURCE_DIR, f), 
-        on_bad_lines='skip', 
-        engine='python') 
-    for f in os.listdir(SOURCE_DIR) if f.endswith('.csv')])
+# Token-Cache: bereits tokenisierte Texte (Schlüssel = SHA-1 des Textes) werden nicht erneut kodiert
+TOKEN_CACHE_DIR = ".data/token_cache"
+MAX_SEGMENTS = 16       # ab mehr Segmenten werden alle zu einem zusammengeführt (sonst wird jeder Lookup langsamer)
 
-# 2. Tokenisieren
-encodings = tokenizer(df['text'].astype(str).tolist(), truncation=True, padding=True, max_length=128, return_tensors="pt")
+def load_tokenizer():
+    return AutoTokenizer.from_pretrained("vinai/bertweet-base", normalization=True, token=hf_token)
 
-# 3. Speichern (Clean & Safe)
-# .data extrahiert die reinen Tensoren aus dem BatchEncoding-Objekt
-payload = {
-    "input_ids": encodings.input_ids,
-    "attention_mask": encodings.attention_mask,
-    "labels": torch.tensor(df['label'].values, dtype=torch.int64) 
-}
+def tokenizer_fingerprint(tokenizer):
+    """Alles, was die Token-IDs beeinflusst; ändert sich davon etwas, wird der Token-Cache verworfen."""
+    init_kwargs = {k: v for k, v in tokenizer.init_kwargs.items() if isinstance(v, (str, int, float, bool, type(None)))}
+    config = {
+        "name": tokenizer.name_or_path,
+        "class": type(tokenizer).__name__,
+        "init_kwargs": init_kwargs,
+        "vocab": len(tokenizer),
+        "max_length": MAX_LENGTH,
+        "transformers": transformers.__version__,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
 
-save_file(payload, ".data/processed_data.safetensors")
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
 
-print(f"Fertig! {len(df)} Zeilen für Transformer vorbereitet.")
\ No newline at end of file
+def save_keys(keys, path=KEYS_FILE):
+    """Speichert SHA-1-Schlüssel (je 20 Bytes) in der gegebenen Reihenfolge als (n, 20)-uint8-Array."""
+    np.save(path, np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 20))
+
+def load_keys(path=KEYS_FILE):
+    """Gegenstück zu save_keys() als Menge; None, wenn die Datei fehlt."""
+    return {bytes(row) for row in np.load(path)} if os.path.exists(path) else None
+
+class TokenCache:
+    """
+    Inhaltsadressierter Cache: SHA-1(Text) -> Token-IDs (int32, abgeschnitten auf MAX_LENGTH).
+    Jedes flush() schreibt ein Segment aus drei .npy-Dateien: die SHA-1-Werte sortiert, die Token-IDs
+    hintereinander und die Offsets. Segmente werden nur per Memory-Map geöffnet und per Binärsuche abgefragt,
+    im Speicher liegen nur die noch nicht geschriebenen Einträge.
+    Passt der gespeicherte Tokenizer-Fingerprint (oder das Format) nicht, wird der Cache geleert.
+    """
+    FORMAT = 2
+    KEY_DTYPE = "S20"
+
+    def __init__(self, fingerprint, path=TOKEN_CACHE_DIR, max_segments=MAX_SEGMENTS):
+        self.path = path
+        self.max_segments = max_segments
+        self._new = {}
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        files = [f for f in os.listdir(path) if f.startswith("segment_")]
+        if meta is None or meta.get("fingerprint") != fingerprint or meta.get("format") != self.FORMAT:
+            if files:
+                print("Token-Cache passt nicht zur Tokenizer-Konfiguration, wird geleert.")
+            for f in files:
+                os.remove(os.path.join(path, f))
+            files = []
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "format": self.FORMAT}, f)
+        # Die Schlüssel-Datei wird zuletzt geschrieben, nur vollständige Segmente werden geöffnet
+        self.names = sorted(f[:-len(".keys.npy")] for f in files if f.endswith(".keys.npy"))
+        self.segments = [self._open(name) for name in self.names]
+
+    def _open(self, name):
+        base = os.path.join(self.path, name)
+        return tuple(np.load(f"{base}.{part}.npy", mmap_mode="r") for part in ("keys", "input_ids", "offsets"))
+
+    def _lookup(self, key):
+        ids = self._new.get(key)
+        if ids is not None:
+            return ids
+        probe = np.frombuffer(key, dtype=self.KEY_DTYPE)
+        for keys, flat, offsets in self.segments:
+            i = int(np.searchsorted(keys, probe)[0])
+            if i < len(keys) and keys[i:i + 1] == probe:
+                # Kopie statt Sicht auf die Memmap: Segmente können beim Zusammenführen gelöscht werden
+                return np.array(flat[offsets[i]:offsets[i + 1]])
+        return None
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def get(self, key):
+        ids = self._lookup(key)
+        if ids is None:
+            raise KeyError(key)
+        return ids
+
+    def put(self, key, ids):
+        if key not in self:
+            self._new[key] = np.asarray(ids, dtype=np.int32)
+
+    def missing(self, keys):
+        """Indizes der Schlüssel, die noch nicht im Cache sind (jeder Schlüssel nur einmal)."""
+        probe = np.frombuffer(b"".join(keys), dtype=self.KEY_DTYPE)
+        found = np.zeros(len(keys), dtype=bool)
+        for segment_keys, _, _ in self.segments:
+            if len(segment_keys):
+                pos = np.minimum(np.searchsorted(segment_keys, probe), len(segment_keys) - 1)
+                found |= segment_keys[pos] == probe
+        seen, result = set(), []
+        for i, key in enumerate(keys):
+            if not found[i] and key not in self._new and key not in seen:
+                seen.add(key)
+                result.append(i)
+        return result
+
+    def flush(self):
+        """Schreibt die seit dem letzten flush() hinzugekommenen Einträge als neues Segment."""
+        if not self._new:
+            return
+        keys = np.frombuffer(b"".join(self._new), dtype=self.KEY_DTYPE)
+        order = np.argsort(keys, kind="stable")
+        values = list(self._new.values())
+        values = [values[i] for i in order]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in values], out=offsets[1:])
+        name = self._next_name()
+        for part, array in (("input_ids", np.concatenate(values)), ("offsets", offsets), ("keys", keys[order])):
+            path = os.path.join(self.path, f"{name}.{part}.npy")
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        self.names.append(name)
+        self.segments.append(self._open(name))
+        self._new = {}
+        if len(self.segments) > self.max_segments:
+            self.merge()
+
+    def _next_name(self):
+        return f"segment_{int(self.names[-1][len('segment_'):]) + 1 if self.names else 0:05d}"
+
+    def merge(self):
+        """
+        Führt alle Segmente zu einem zusammen (sortiert, doppelte Schlüssel nur einmal).
+        Die Token-IDs werden direkt in eine Memmap geschrieben, im Speicher liegen nur Schlüssel und Längen.
+        """
+        if len(self.segments) <= 1:
+            return
+        keys = np.concatenate([segment[0] for segment in self.segments])
+        source = np.concatenate([np.full(len(segment[0]), s, dtype=np.int32) for s, segment in enumerate(self.segments)])
+        position = np.concatenate([np.arange(len(segment[0])) for segment in self.segments])
+        keys, first = np.unique(keys, return_index=True)
+        source, position = source[first], position[first]
+        starts = np.zeros(len(keys), dtype=np.int64)
+        ends = np.zeros(len(keys), dtype=np.int64)
+        for s, (_, _, segment_offsets) in enumerate(self.segments):
+            mask = source == s
+            starts[mask] = segment_offsets[position[mask]]
+            ends[mask] = segment_offsets[position[mask] + 1]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=offsets[1:])
+
+        name = self._next_name()
+        base = os.path.join(self.path, name)
+        flat = np.lib.format.open_memmap(f"{base}.input_ids.npy.tmp", mode="w+", dtype=np.int32, shape=(int(offsets[-1]),))
+        for i, (s, start, end) in enumerate(zip(source, starts, ends)):
+            flat[offsets[i]:offsets[i + 1]] = self.segments[s][1][start:end]
+        flat.flush()
+        del flat
+        os.replace(f"{base}.input_ids.npy.tmp", f"{base}.input_ids.npy")
+        for part, array in (("offsets", offsets), ("keys", keys)):
+            with open(f"{base}.{part}.npy.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{base}.{part}.npy.tmp", f"{base}.{part}.npy")
+
+        # Alte Segmente erst nach dem vollständigen neuen entfernen (Schlüssel-Datei zuerst -> nie halb geöffnet)
+        old, self.segments = self.names, []
+        for old_name in old:
+            for part in ("keys", "input_ids", "offsets"):
+                os.remove(os.path.join(self.path, f"{old_name}.{part}.npy"))
+        self.names = [name]
+        self.segments = [self._open(name)]
+
+def tokenize_full():
+    """Ursprünglicher Modus: alles in den Speicher laden, auf die längste Zeile padden, eine Datei schreiben."""
+    tokenizer = load_tokenizer()
+    cache = TokenCache(tokenizer_fingerprint(tokenizer))
+
+    # 1. Korpus laden (Parquet aus data/*.csv, wird bei Bedarf neu gebaut, ohne Near-Duplicates), nur die benötigten Spalten
+    df = read_corpus(columns=['label', 'text'], dedup=True)
+    texts = df['text'].astype(str).tolist()
+
+    # 2. Tokenisieren: nur Texte, die noch nicht im Token-Cache sind
+    keys = [text_key(t) for t in texts]
+    missing = cache.missing(keys)
+    if missing:
+        encoded = tokenizer([texts[i] for i in missing], truncation=True, max_length=MAX_LENGTH)["input_ids"]
+        for i, ids in zip(missing, encoded):
+            cache.put(keys[i], ids)
+        cache.flush()
+    print(f"Token-Cache: {len(texts) - len(missing)} Treffer, {len(missing)} neu tokenisiert")
+
+    # Auf die längste Zeile padden (wie tokenizer(..., padding=True))
+    ids = [cache.get(k) for k in keys]
+    max_len = max(len(x) for x in ids)
+    input_ids = torch.full((len(ids), max_len), tokenizer.pad_token_id, dtype=torch.int64)
+    attention_mask = torch.zeros((len(ids), max_len), dtype=torch.int64)
+    for i, x in enumerate(ids):
+        input_ids[i, :len(x)] = torch.from_numpy(x.astype(np.int64))
+        attention_mask[i, :len(x)] = 1
+
+    # 3. Speichern (Clean & Safe)
+    payload = {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "labels": torch.tensor(df['label'].to_numpy(dtype='int64'), dtype=torch.int64)
+    }
+
+    save_file(payload, OUTPUT_FILE)
+    save_keys(keys)
+    print(f"Fertig! {len(df)} Zeilen für Transformer vorbereitet.")
+
+# ---------- Streaming-Modus ----------
+_worker_tokenizer = None
+
+def _init_worker():
+    global _worker_tokenizer
+    _worker_tokenizer = load_tokenizer()
+    torch.set_num_threads(1)
+
+def _encode_chunk(texts):
+    """Läuft im Worker-Prozess: tokenisiert ohne Padding und gibt flache IDs + Längen zurück."""
+    ids = _worker_tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]
+    lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+    flat = np.fromiter((t for x in ids for t in x), dtype=np.int32, count=int(lengths.sum()))
+    return flat, lengths
+
+def _read_chunks():
+    for chunk in iter_corpus(columns=['label', 'text'], batch_size=CHUNK_ROWS, dedup=True):
+        yield chunk['text'].astype(str).tolist(), chunk['label'].astype(int).tolist()
+
+def write_shard(index, parts):
+    """
+    Schreibt einen Shard ohne Padding:
+    input_ids = alle Token-IDs hintereinander, offsets[i]:offsets[i+1] = Zeile i.
+    """
+    flat = np.concatenate([p[0] for p in parts])
+    lengths = np.concatenate([p[1] for p in parts])
+    labels = np.concatenate([p[2] for p in parts])
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    path = os.path.join(SHARD_DIR, f"shard_{index:05d}.safetensors")
+    save_file({
+        "input_ids": torch.from_numpy(flat),
+        "offsets": torch.from_numpy(offsets),
+        "labels": torch.from_numpy(labels),
+    }, path)
+    return len(labels)
+
+def tokenize_streaming(workers=None):
+    """
+    Korpus in Batches lesen, über einen Prozess-Pool tokenisieren und in Shards schreiben.
+    Es sind höchstens 2 * workers Chunks gleichzeitig unterwegs, der Speicherbedarf bleibt also flach.
+    Hinweis: Für BERTweet gibt es keinen "fast" Tokenizer, die Parallelisierung kommt vom Prozess-Pool.
+    Texte aus dem Token-Cache gehen gar nicht erst an den Pool.
+    """
+    workers = workers or os.cpu_count()
+    cache = TokenCache(tokenizer_fingerprint(load_tokenizer()))
+    encoded_rows = 0
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    for f in os.listdir(SHARD_DIR):
+        if f.endswith(".safetensors"):
+            os.remove(os.path.join(SHARD_DIR, f))
+
+    shard_index, total = 0, 0
+    parts, part_rows = [], 0
+    all_keys = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        in_flight = deque()
+        chunks = _read_chunks()
+        exhausted = False
+        while in_flight or not exhausted:
+            # Pool auffüllen, Reihenfolge bleibt durch die deque erhalten
+            while not exhausted and len(in_flight) < 2 * workers:
+                try:
+                    texts, labels = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                keys = [text_key(t) for t in texts]
+                missing = cache.missing(keys)
+                future = pool.submit(_encode_chunk, [texts[i] for i in missing]) if missing else None
+                in_flight.append((keys, labels, missing, future))
+            if not in_flight:
+                break
+
+            keys, labels, missing, future = in_flight.popleft()
+            all_keys.extend(keys)
+            if future is not None:
+                flat, lengths = future.result()
+                for i, ids in zip(missing, np.split(flat, np.cumsum(lengths)[:-1])):
+                    cache.put(keys[i], ids)
+                encoded_rows += len(missing)
+            rows = [cache.get(k) for k in keys]
+            part = (np.concatenate(rows), np.array([len(x) for x in rows], dtype=np.int64), np.asarray(labels, dtype=np.int64))
+            parts.append(part)
+            part_rows += len(part[2])
+            if part_rows >= SHARD_ROWS:
+                total += write_shard(shard_index, parts)
+                shard_index += 1
+                parts, part_rows = [], 0
+                cache.flush()  # pro Shard ein Segment, neue Token-IDs bleiben nicht bis zum Ende im Speicher
+
+    if parts:
+        total += write_shard(shard_index, parts)
+        shard_index += 1
+    cache.flush()
+    save_keys(all_keys)
+    print(f"Token-Cache: {total - encoded_rows} Treffer, {encoded_rows} neu tokenisiert")
+
+    print(f"Fertig! {total} Zeilen in {shard_index} Shards unter {SHARD_DIR} (ohne Padding).")
+
+if __name__ == "__main__":
+    if not hf_token:
+        print("Warnung: Kein HUGGINGFACE_API Token in .env gefunden!")
+    os.makedirs(".data", exist_ok=True)
+
+    # python src/tokenizer.py --stream  -> Streaming-Modus mit Shards
+    if "--stream" in sys.argv:
+        tokenize_streaming()
+    else:
+        tokenize_full()
\ No newline at end of file
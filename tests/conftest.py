@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Module liegen flach in src/ und data/ (wie beim Aufruf über python src/xyz.py)
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, "src"))
+sys.path.insert(0, os.path.join(root, "data"))
@@ -0,0 +1,32 @@
+import os
+import corpus
+import corpus_stats
+
+def write(path, lines, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime + 10, stat.st_mtime + 10))
+
+def test_append_matches_full_recompute(tmp_path, monkeypatch, capsys):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(corpus, "SOURCE_DIR", str(data))
+    monkeypatch.chdir(tmp_path)
+    csv = str(data / "trump_truths_social.csv")
+    write(csv, ["label,text", "0,MAKE AMERICA GREAT! 🇺🇸 #MAGA", "0,Thank you @elonmusk!"])
+    corpus_stats.load_corpus_stats(csv)
+
+    # Angehängt: normale Zeile, leerer Text, kaputte Zeile (zu viele Felder), Zeile ohne Label
+    write(csv, ["0,New post 🚀 @JDVance #maga", "0,", "0,a,b,c", ",no label"], mode="a")
+    bump_mtime(csv)
+    appended = corpus_stats.load_corpus_stats(csv)
+    assert "neue Zeilen ausgewertet" in capsys.readouterr().out
+
+    os.remove(corpus_stats._cache_path(csv))
+    full = corpus_stats.load_corpus_stats(csv)
+    assert appended == full
+    assert full["rows"] == 4
+    assert full["mentions"]["JDVance"] == 1
@@ -0,0 +1,17 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+from features import count_features
+
+def test_counts_emojis_mentions_hashtags():
+    stats = count_features(["Hi @elon #Mars 🚀🚀!", "GREAT!! @elon"])
+    assert stats["rows"] == 2
+    assert stats["exclaim"] == 3
+    assert stats["emojis"] == Counter({"🚀": 2})
+    assert stats["mentions"] == Counter({"elon": 2})
+    assert stats["hashtags"] == Counter({"Mars": 1})
+
+def test_missing_texts_count_as_empty():
+    stats = count_features(pd.Series(["abc", np.nan, None]))
+    assert stats["rows"] == 3
+    assert stats["chars"] == 3
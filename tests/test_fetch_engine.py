@@ -0,0 +1,33 @@
+from urllib.parse import parse_qs, urlparse
+from fetch_engine import FetchEngine
+
+def make_statuses(n, first=1_000_000 << 16):
+    # Neueste zuerst, wie die Timeline-API
+    return [{"id": str(first + i * 997)} for i in reversed(range(n))]
+
+def fake_fetch_many(statuses, limit, rate_limit_once=True):
+    state = {"limited": not rate_limit_once}
+
+    def fetch(url):
+        query = parse_qs(urlparse(url).query)
+        max_id, since_id = int(query["max_id"][0]), int(query["since_id"][0])
+        page = [s for s in statuses if since_id < int(s["id"]) < max_id][:limit]
+        return 200, {}, page
+
+    def fetch_many(urls):
+        responses = [fetch(url) for url in urls]
+        if not state["limited"]:
+            state["limited"] = True
+            responses[0] = (429, {"Retry-After": "0"}, None)
+        return responses
+    return fetch_many
+
+def test_pages_are_complete_and_strictly_descending():
+    statuses = make_statuses(500)
+    engine = FetchEngine(fake_fetch_many(statuses, limit=40), "http://mock", user_id=1,
+                         concurrency=4, rate=1000.0, limit=40)
+    lo, hi = int(statuses[-1]["id"]) - 1, int(statuses[0]["id"]) + 1
+    ids = [int(s["id"]) for page in engine.pages(max_id=hi, since_id=lo) for s in page]
+    assert ids == [int(s["id"]) for s in statuses]
+    assert engine.stats["rate_limited"] == 1
+    assert engine.stats["statuses"] == 500
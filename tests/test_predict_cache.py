@@ -0,0 +1,56 @@
+import pytest
+import predict
+from predict import PredictionCache
+
+@pytest.fixture
+def frontend(monkeypatch):
+    """predict_batch(score=...) ohne Modell und Tokenizer: nur Cache, keine Kaskade."""
+    cache = PredictionCache("test", max_entries=100)
+    monkeypatch.setattr(predict, "tokenizer", object())
+    monkeypatch.setattr(predict, "cascade_model", None)
+    monkeypatch.setattr(predict, "cache", cache)
+    monkeypatch.setattr(predict, "_frontend_ready", True)
+    calls = []
+
+    def score(texts, batch_size):
+        calls.append(list(texts))
+        return [{"Donald Trump": len(t) / 100, "Elon Musk": 1 - len(t) / 100} for t in texts]
+    return cache, calls, score
+
+def test_hits_and_misses(frontend):
+    cache, calls, score = frontend
+    first = predict.predict_batch(["hello", "world"], score=score)
+    second = predict.predict_batch(["world", "new"], score=score)
+    assert calls == [["hello", "world"], ["new"]]
+    assert second[0] == first[1]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+def test_duplicates_in_batch_are_computed_once(frontend):
+    cache, calls, score = frontend
+    results = predict.predict_batch(["a", "", "a", "b", "a"], score=score)
+    assert calls == [["a", "b"]]
+    assert cache.stats()["misses"] == 2
+    assert results[1] == {"Error": 1.0}
+    assert results[0] == results[2] == results[4]
+    results[0]["Donald Trump"] = -1.0
+    assert results[2]["Donald Trump"] != -1.0
+
+def test_key_is_the_exact_text(frontend):
+    _, calls, score = frontend
+    predict.predict_batch(["Hello @elonmusk"], score=score)
+    predict.predict_batch(["Hello  @elonmusk"], score=score)
+    assert calls == [["Hello @elonmusk"], ["Hello  @elonmusk"]]
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = PredictionCache("model-a", max_entries=2, path=path)
+    cache.put("a", {"x": 1.0})
+    cache.put("b", {"x": 2.0})
+    cache.get("a")
+    cache.put("c", {"x": 3.0})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"x": 1.0}
+    cache.save()
+    assert PredictionCache("model-a", path=path).stats()["entries"] == 2
+    assert PredictionCache("model-b", path=path).stats()["entries"] == 0
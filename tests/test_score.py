@@ -0,0 +1,39 @@
+import score
+
+HEADER = score.OUTPUT_HEADER
+
+def write(path, content):
+    path.write_bytes(content.encode("utf-8"))
+
+def test_resume_truncates_partial_last_line(tmp_path):
+    out = tmp_path / "out.csv"
+    write(out, HEADER + "0,0.100000,0.900000\n1,0.200000,0.800000\n2,0.3")
+    assert score.rows_done(str(out)) == 2
+    # Die halbe Zeile ist weg, weitergeschrieben wird direkt nach der letzten vollständigen
+    assert out.read_text(encoding="utf-8") == HEADER + "0,0.100000,0.900000\n1,0.200000,0.800000\n"
+
+def test_resume_complete_file_and_empty_scores(tmp_path):
+    out = tmp_path / "out.csv"
+    write(out, HEADER + "0,0.100000,0.900000\n1,,\n")
+    assert score.rows_done(str(out)) == 2
+
+def test_resume_header_only_missing_or_broken(tmp_path):
+    out = tmp_path / "out.csv"
+    assert score.rows_done(str(out)) is None
+    write(out, HEADER)
+    assert score.rows_done(str(out)) == 0
+    write(out, HEADER[:5])
+    assert score.rows_done(str(out)) is None
+
+def test_resume_reads_across_blocks(tmp_path):
+    # Mehr als ein Block (64 KiB) hinter der letzten vollständigen Zeile
+    out = tmp_path / "out.csv"
+    lines = "".join(f"{i},0.500000,0.500000\n" for i in range(5000))
+    write(out, HEADER + lines + "x" * 70_000)
+    assert score.rows_done(str(out)) == 5000
+    assert out.read_text(encoding="utf-8").endswith("4999,0.500000,0.500000\n")
+
+def test_skip_rows_spans_chunks():
+    chunks = [["a", "b"], ["c", "d", "e"], ["f"]]
+    assert list(score.skip_rows(iter(chunks), 3)) == [["d", "e"], ["f"]]
+    assert list(score.skip_rows(iter(chunks), 0)) == chunks
@@ -0,0 +1,39 @@
+import pandas as pd
+import search_index
+
+def corpus(trump, musk):
+    return pd.DataFrame({
+        "source": ["trump_truths_social"] * len(trump) + ["musk_twitter_dataset"] * len(musk),
+        "text": trump + musk,
+    })
+
+def test_appended_rows_are_indexed_incrementally(monkeypatch):
+    trump, musk = ["Make America great", "Fake news media"], ["Rockets are great"]
+    monkeypatch.setattr(search_index, "read_corpus", lambda columns=None: corpus(trump, musk))
+    index = search_index.SearchIndex()
+    assert index.update() == 3
+
+    added = []
+    original_add = index.add
+    monkeypatch.setattr(index, "add", lambda source, texts: (added.append((source, list(texts))), original_add(source, texts)))
+    trump.append("Great news for America")
+    assert index.update() == 1
+    assert added == [("trump_truths_social", ["Great news for America"])]
+    assert len(index) == 4
+    assert index.search("great america")["matches"] == {"trump_truths_social": 2, "musk_twitter_dataset": 0}
+
+def test_changed_prefix_rebuilds(monkeypatch):
+    texts = ["one two", "three four"]
+    monkeypatch.setattr(search_index, "read_corpus", lambda columns=None: corpus(texts, []))
+    index = search_index.SearchIndex()
+    index.update()
+    texts[0] = "five six"
+    assert index.update() == 2
+    assert len(index) == 2
+    assert index.term_counts("one")["posts"]["trump_truths_social"] == 0
+
+def test_unknown_source_has_no_matches(monkeypatch):
+    monkeypatch.setattr(search_index, "read_corpus", lambda columns=None: corpus(["hello world"], []))
+    index = search_index.SearchIndex()
+    index.update()
+    assert len(index.match(["hello"], source="musk_twitter_dataset")) == 0
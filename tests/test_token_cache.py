@@ -0,0 +1,46 @@
+import os
+import numpy as np
+from tokenizer import TokenCache, text_key, save_keys, load_keys
+
+def ids_for(text):
+    return [0] + [ord(c) for c in text] + [2]
+
+def test_put_flush_and_lookup(tmp_path):
+    cache = TokenCache("fp", path=str(tmp_path))
+    keys = [text_key(t) for t in ("a", "bb", "a")]
+    assert cache.missing(keys) == [0, 1]
+    cache.put(keys[0], ids_for("a"))
+    cache.flush()
+    assert cache.missing(keys) == [1]
+
+    reopened = TokenCache("fp", path=str(tmp_path))
+    assert keys[0] in reopened and keys[1] not in reopened
+    assert reopened.get(keys[0]).tolist() == ids_for("a")
+
+def test_segments_are_merged(tmp_path):
+    cache = TokenCache("fp", path=str(tmp_path), max_segments=3)
+    texts = [f"post {i}" for i in range(10)]
+    for text in texts:
+        cache.put(text_key(text), ids_for(text))
+        cache.flush()
+        assert len(cache.segments) <= 3
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".keys.npy")]) == len(cache.segments)
+
+    reopened = TokenCache("fp", path=str(tmp_path), max_segments=3)
+    assert reopened.missing([text_key(t) for t in texts]) == []
+    for text in texts:
+        assert reopened.get(text_key(text)).tolist() == ids_for(text)
+
+def test_other_fingerprint_clears_cache(tmp_path):
+    cache = TokenCache("fp", path=str(tmp_path))
+    cache.put(text_key("a"), ids_for("a"))
+    cache.flush()
+    assert text_key("a") not in TokenCache("other", path=str(tmp_path))
+
+def test_keys_roundtrip(tmp_path):
+    path = str(tmp_path / "keys.npy")
+    keys = [text_key(t) for t in ("x", "y")]
+    save_keys(keys, path)
+    assert np.load(path).shape == (2, 20)
+    assert load_keys(path) == set(keys)
+    assert load_keys(str(tmp_path / "missing.npy")) is None